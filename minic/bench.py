@@ -0,0 +1,191 @@
+# bench.py
+"""
+Benchmarks
+==========
+
+Ejecuta los programas del directorio benchmarks/ y mide por separado:
+
+*   La velocidad del compilador: líneas de código por segundo en cada
+    fase de compile_ircode() (ver phases.py).
+
+*   La velocidad del intérprete: el tiempo de ejecución con el
+    intérprete normal (con el JIT de jit.py) y sin el JIT, el mejor de
+    --repeat ejecuciones.  La cantidad de instrucciones IR ejecutadas se
+    cuenta una vez con ProfilingInterpreter, que no usa el JIT, así que
+    las instrucciones por segundo se calculan con el tiempo sin JIT.
+
+Si existe benchmarks/<nombre>.expected, la salida del programa debe
+coincidir con ese archivo.  Además del directorio se incluye un programa
+grande generado con synth.py, que solo se compila.
+
+Los resultados se pueden guardar en JSON y comparar con una línea base.
+El programa termina con error si aumenta la cantidad de instrucciones
+ejecutadas, que no depende de la máquina ni de la carga del sistema.  Los
+tiempos que empeoran más que el umbral solo se informan: duran
+centésimas de segundo y varían más que eso entre una ejecución y otra.
+
+    bash % python3 -m minic.bench --save benchmarks/baseline.json
+    bash % python3 -m minic.bench --baseline benchmarks/baseline.json --threshold 0.15
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from errors import clear_errors, errors_reported
+from interp import Interpreter, ProfilingInterpreter
+from ircode import compile_ircode
+from output import MemoryOutput
+from synth import generate_program
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+# Tamaño del programa generado (ver synth.py), en cantidad de funciones
+GENERATED_FUNCTIONS = 20
+
+
+def load_benchmarks(names=None):
+    """
+    Devuelve una lista de (nombre, fuente, salida esperada o None, ejecutar)
+    """
+    benchmarks = []
+    for filename in sorted(os.listdir(BENCHMARK_DIR)):
+        name, ext = os.path.splitext(filename)
+        if ext != '.c' or (names and name not in names):
+            continue
+        with open(os.path.join(BENCHMARK_DIR, filename)) as file:
+            source = file.read()
+        expected = os.path.join(BENCHMARK_DIR, name + '.expected')
+        if os.path.exists(expected):
+            with open(expected) as file:
+                expected = file.read()
+        else:
+            expected = None
+        benchmarks.append((name, source, expected, True))
+
+    if not names or 'generated' in names:
+        benchmarks.append(('generated', generate_program(functions=GENERATED_FUNCTIONS), None, False))
+    return benchmarks
+
+
+def run_program(interpreter, code):
+    """
+    Ejecuta el programa y devuelve (segundos, salida)
+    """
+    interpreter.output = MemoryOutput()
+    start = time.perf_counter()
+    interpreter.execute(code)
+    elapsed = time.perf_counter() - start
+    return elapsed, interpreter.output.getvalue()
+
+
+def run_benchmark(name, source, expected, execute, repeat):
+    """
+    Mide un programa.  Devuelve un diccionario con los resultados.
+    """
+    lines = source.count('\n') + 1
+    result = {'lines': lines}
+
+    # Compilación: el mejor tiempo de cada fase
+    best = {}
+    for _ in range(repeat):
+        clear_errors()
+        phases = []
+        code = compile_ircode(source, phases=phases, trace_memory=False)
+        if errors_reported():
+            raise RuntimeError(f"{name}: compilation failed")
+        for stats in phases:
+            best[stats.name] = min(best.get(stats.name, stats.wall_time), stats.wall_time)
+
+    result['compile'] = {phase: {'time': seconds, 'lines_per_second': lines / seconds if seconds else None}
+                         for phase, seconds in best.items()}
+    result['compile_time'] = sum(best.values())
+    if not execute:
+        return result
+
+    profiler = ProfilingInterpreter()
+    _, output = run_program(profiler, code)
+    if expected is not None and output != expected:
+        raise RuntimeError(f"{name}: unexpected output {output!r}")
+    instructions = sum(row['count'] for row in profiler.profile()['opcodes'])
+
+    result['run_time'] = min(run_program(Interpreter(), code)[0] for _ in range(repeat))
+    interp_time = min(run_program(Interpreter(jit_threshold=None), code)[0] for _ in range(repeat))
+    result['interp_time'] = interp_time
+    result['instructions'] = instructions
+    result['instructions_per_second'] = instructions / interp_time
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara los resultados con la línea base.  Devuelve dos listas de
+    mensajes: las cantidades de instrucciones que aumentaron, y los
+    tiempos que empeoraron más que threshold (una fracción).
+    """
+    regressions = []
+    slower = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name].get('instructions')
+        new = result.get('instructions')
+        if old and new and new > old:
+            regressions.append(f"{name}: instructions {old} -> {new}")
+        for key in ('compile_time', 'run_time', 'interp_time'):
+            old = baseline[name].get(key)
+            new = result.get(key)
+            if old and new and new > old * (1 + threshold):
+                slower.append(f"{name}: {key} {old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100:.1f}%)")
+    return regressions, slower
+
+
+def format_results(results):
+    lines = [f"{'benchmark':<12}{'lines':>8}{'compile (s)':>14}{'lines/s':>12}"
+             f"{'run (s)':>10}{'no jit (s)':>12}{'instructions':>14}{'instr/s':>12}"]
+    for name, result in results.items():
+        row = (f"{name:<12}{result['lines']:>8}{result['compile_time']:>14.4f}"
+               f"{result['lines'] / result['compile_time']:>12.0f}")
+        if 'run_time' in result:
+            row += (f"{result['run_time']:>10.4f}{result['interp_time']:>12.4f}{result['instructions']:>14}"
+                    f"{result['instructions_per_second']:>12.0f}")
+        lines.append(row)
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 -m minic.bench')
+    parser.add_argument('names', nargs='*', help='benchmarks a ejecutar (todos si no se indica)')
+    parser.add_argument('--repeat', type=int, default=3, help='ejecuciones de cada medición')
+    parser.add_argument('--save', metavar='FILE', help='guardar los resultados en JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='comparar con resultados guardados')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='empeoramiento de los tiempos que se informa (fracción, por defecto 0.20)')
+    args = parser.parse_args()
+
+    results = {}
+    for name, source, expected, execute in load_benchmarks(args.names):
+        results[name] = run_benchmark(name, source, expected, execute, args.repeat)
+
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions, slower = compare(results, baseline, args.threshold)
+        for message in slower:
+            sys.stderr.write(f"slower: {message}\n")
+        for message in regressions:
+            sys.stderr.write(f"regression: {message}\n")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
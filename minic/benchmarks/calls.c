@@ -0,0 +1,32 @@
+/* Muchas llamadas a funciones auxiliares pequeñas */
+
+int square(int x) {
+    return x * x;
+}
+
+int max(int a, int b) {
+    if (a > b) {
+        return a;
+    }
+    return b;
+}
+
+int clamp(int x, int low, int high) {
+    if (x < low) {
+        return low;
+    }
+    if (x > high) {
+        return high;
+    }
+    return x;
+}
+
+int main(void) {
+    int i;
+    int total = 0;
+    for (i = 0; i < 40000; i++) {
+        total = total + clamp(square(i % 100), 10, 5000) + max(i % 13, 6);
+    }
+    print(total);
+    return 0;
+}
@@ -0,0 +1,13 @@
+/* Recursión doble: cantidad exponencial de llamadas */
+
+int fib(int n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+
+int main(void) {
+    print(fib(20));
+    return 0;
+}
@@ -0,0 +1,17 @@
+/* Ciclos anidados con aritmética entera y de punto flotante */
+
+int main(void) {
+    int i;
+    int j;
+    int total = 0;
+    float x = 0.0;
+    for (i = 0; i < 300; i++) {
+        for (j = 0; j < 300; j++) {
+            total = total + (i * j) % 7;
+        }
+        x = x + 0.5;
+    }
+    print(total);
+    print(x);
+    return 0;
+}
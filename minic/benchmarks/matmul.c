@@ -0,0 +1,47 @@
+/* Multiplicación de matrices guardadas por filas en arreglos */
+
+int N = 30;
+int A[900];
+int B[900];
+int C[900];
+
+void init() {
+    int i;
+    int j;
+    for (i = 0; i < N; i++) {
+        for (j = 0; j < N; j++) {
+            A[i * N + j] = i + j;
+            B[i * N + j] = i - 2 * j;
+        }
+    }
+    return;
+}
+
+void multiply() {
+    int i;
+    int j;
+    int k;
+    int sum;
+    for (i = 0; i < N; i++) {
+        for (j = 0; j < N; j++) {
+            sum = 0;
+            for (k = 0; k < N; k++) {
+                sum = sum + A[i * N + k] * B[k * N + j];
+            }
+            C[i * N + j] = sum;
+        }
+    }
+    return;
+}
+
+int main(void) {
+    int i;
+    int trace = 0;
+    init();
+    multiply();
+    for (i = 0; i < N; i++) {
+        trace = trace + C[i * N + i];
+    }
+    print(trace);
+    return 0;
+}
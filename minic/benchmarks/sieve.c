@@ -0,0 +1,20 @@
+/* Criba de Eratóstenes */
+
+int N = 30000;
+bool composite[30000];
+
+int main(void) {
+    int i;
+    int j;
+    int count = 0;
+    for (i = 2; i < N; i++) {
+        if (!composite[i]) {
+            count++;
+            for (j = i * i; j < N; j += i) {
+                composite[j] = true;
+            }
+        }
+    }
+    print(count);
+    return 0;
+}
@@ -0,0 +1,44 @@
+/* Ordenamiento por inserción de números pseudo-aleatorios */
+
+int N = 400;
+int A[400];
+int seed = 12345;
+
+int next_random() {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    return seed % 10000;
+}
+
+void insertion_sort() {
+    int i;
+    int j;
+    int key;
+    for (i = 1; i < N; i++) {
+        key = A[i];
+        j = i - 1;
+        while (j >= 0 && A[j] > key) {
+            A[j + 1] = A[j];
+            j = j - 1;
+        }
+        A[j + 1] = key;
+    }
+    return;
+}
+
+int main(void) {
+    int i;
+    int sorted = 1;
+    for (i = 0; i < N; i++) {
+        A[i] = next_random();
+    }
+    insertion_sort();
+    for (i = 1; i < N; i++) {
+        if (A[i - 1] > A[i]) {
+            sorted = 0;
+        }
+    }
+    print(sorted);
+    print(A[0]);
+    print(A[N - 1]);
+    return 0;
+}
@@ -0,0 +1,30 @@
+/* Operaciones elemento a elemento y sumas sobre arreglos grandes */
+
+int N = 20000;
+int A[20000];
+int B[20000];
+int C[20000];
+float X[20000];
+float Y[20000];
+
+int main(void) {
+    int i;
+    int pass;
+    int total = 0;
+    float norm = 0.0;
+    for (i = 0; i < N; i++) {
+        A[i] = i % 100;
+        B[i] = (i * 7) % 13;
+        X[i] = 0.5;
+    }
+    for (pass = 0; pass < 20; pass++) {
+        for (i = 0; i < N; i++) C[i] = A[i] * B[i];
+        for (i = 0; i < N; i++) C[i] = C[i] + pass;
+        for (i = 0; i < N; i++) total += C[i];
+        for (i = 0; i < N; i++) Y[i] = X[i] * X[i];
+        for (i = 0; i < N; i++) norm = norm + Y[i];
+    }
+    print(total);
+    print(norm);
+    return 0;
+}
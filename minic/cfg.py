@@ -0,0 +1,207 @@
+# cfg.py
+"""
+Grafo de flujo de control
+=========================
+
+Utilidades para analizar el código IR de una función (ver ircode.py)
+como un grafo de bloques básicos.  Un bloque básico es una secuencia de
+instrucciones que siempre se ejecuta completa: solo se puede entrar por
+su primera instrucción y solo se sale por la última.
+
+Los bloques comienzan en cada LABEL y después de cada instrucción de
+salto (BRANCH, CBRANCH, BLT..., CMPBR..., LOOP, RET, RETV).  Los sucesores de un
+bloque son los destinos de su salto final, o el bloque siguiente si no
+termina en un salto incondicional.
+
+Las pasadas de optimización y la asignación de registros usan estas
+funciones sobre la lista de tuplas de Function.code.
+"""
+
+from ircode import OpCode, operand_kinds
+
+# Instrucciones que terminan un bloque básico
+TERMINATORS = {OpCode.BRANCH, OpCode.CBRANCH, OpCode.RET, OpCode.RETV,
+               OpCode.LOOPLI, OpCode.LOOPGI}
+
+# Saltos condicionales que comparan dos registros (BLTI, BEQF, ...)
+COMPARE_BRANCHES = {op for op in OpCode if op.name[:3] in ('BLT', 'BLE', 'BGT', 'BGE', 'BEQ', 'BNE')}
+TERMINATORS |= COMPARE_BRANCHES
+
+# Operador y sufijo de tipo de cada uno de esos saltos: BLTI -> ('<', 'I')
+COMPARE_BRANCH_OPS = {}
+for _op, _name in (('<', 'BLT'), ('<=', 'BLE'), ('>', 'BGT'), ('>=', 'BGE'), ('==', 'BEQ'), ('!=', 'BNE')):
+    for _suffix in 'IFB':
+        COMPARE_BRANCH_OPS[OpCode[_name + _suffix]] = (_op, _suffix)
+
+# Saltos condicionales que comparan una variable (CMPBRLI, ...)
+TERMINATORS |= {op for op in OpCode if op.name.startswith('CMPBR')}
+
+# Instrucciones después de las cuales nunca se continúa con la siguiente
+UNCONDITIONAL = {OpCode.BRANCH, OpCode.RET, OpCode.RETV, OpCode.LOOPLI, OpCode.LOOPGI}
+
+
+class BasicBlock:
+    """
+    Rango [start, end) de instrucciones de una función
+    """
+
+    def __init__(self, index, start, end):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.successors = []
+        self.predecessors = []
+
+    def __repr__(self):
+        return f"BasicBlock({self.index}, [{self.start}, {self.end}) -> {self.successors})"
+
+
+def uses_defs(instruction):
+    """
+    Devuelve las listas de registros que lee y que escribe una instrucción
+    """
+    uses = []
+    defs = []
+    for kind, operand in zip(operand_kinds(instruction), instruction[1:]):
+        if kind == 'r':
+            uses.append(operand)
+        elif kind == 'w':
+            defs.append(operand)
+    return uses, defs
+
+
+def label_targets(instruction):
+    """
+    Devuelve las etiquetas a las que puede saltar una instrucción
+    """
+    return [operand for kind, operand in zip(operand_kinds(instruction), instruction[1:])
+            if kind == 'l' and instruction[0] != OpCode.LABEL]
+
+
+def build_blocks(code):
+    """
+    Divide el código de una función en bloques básicos y los enlaza
+    """
+    starts = {0}
+    for pc, instruction in enumerate(code):
+        if instruction[0] == OpCode.LABEL:
+            starts.add(pc)
+        elif instruction[0] in TERMINATORS:
+            starts.add(pc + 1)
+    starts = sorted(start for start in starts if start < len(code))
+
+    blocks = [BasicBlock(n, start, end)
+              for n, (start, end) in enumerate(zip(starts, starts[1:] + [len(code)]))]
+
+    block_of_label = {}
+    for block in blocks:
+        if code[block.start][0] == OpCode.LABEL:
+            block_of_label[code[block.start][1]] = block.index
+
+    for block in blocks:
+        last = code[block.end - 1]
+        targets = [block_of_label[label] for label in label_targets(last)]
+        if last[0] not in UNCONDITIONAL and block.index + 1 < len(blocks):
+            targets.append(block.index + 1)
+        for target in targets:
+            if target not in block.successors:
+                block.successors.append(target)
+                blocks[target].predecessors.append(block.index)
+
+    return blocks
+
+
+def liveness(code, blocks):
+    """
+    Calcula los registros vivos a la entrada y a la salida de cada bloque.
+    Devuelve dos listas de conjuntos, indexadas por el número del bloque.
+    """
+    gen = []
+    kill = []
+    for block in blocks:
+        used = set()
+        defined = set()
+        for instruction in code[block.start:block.end]:
+            uses, defs = uses_defs(instruction)
+            used.update(reg for reg in uses if reg not in defined)
+            defined.update(defs)
+        gen.append(used)
+        kill.append(defined)
+
+    live_in = [set() for _ in blocks]
+    live_out = [set() for _ in blocks]
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(blocks):
+            out = set()
+            for succ in block.successors:
+                out |= live_in[succ]
+            new_in = gen[block.index] | (out - kill[block.index])
+            if out != live_out[block.index] or new_in != live_in[block.index]:
+                live_out[block.index] = out
+                live_in[block.index] = new_in
+                changed = True
+
+    return live_in, live_out
+
+
+def dominators(blocks):
+    """
+    Calcula el conjunto de bloques que domina a cada bloque, es decir los
+    bloques por los que pasa todo camino desde la entrada de la función
+    """
+    if not blocks:
+        return []
+
+    everything = set(range(len(blocks)))
+    dom = [everything for _ in blocks]
+    dom[0] = {0}
+    changed = True
+    while changed:
+        changed = False
+        for block in blocks[1:]:
+            preds = [dom[pred] for pred in block.predecessors]
+            new = set.intersection(*preds) if preds else set()
+            new = new | {block.index}
+            if new != dom[block.index]:
+                dom[block.index] = new
+                changed = True
+    return dom
+
+
+class Loop:
+    """
+    Ciclo natural: un bloque cabecera y el conjunto de bloques del cuerpo
+    (que incluye a la cabecera)
+    """
+
+    def __init__(self, header, body):
+        self.header = header
+        self.body = body
+
+    def __repr__(self):
+        return f"Loop(header={self.header}, body={sorted(self.body)})"
+
+
+def natural_loops(blocks):
+    """
+    Encuentra los ciclos naturales a partir de los arcos de retroceso
+    (n -> h donde h domina a n).  Los ciclos con la misma cabecera se unen.
+    Se devuelven ordenados de los más internos a los más externos.
+    """
+    dom = dominators(blocks)
+    loops = {}
+    for block in blocks:
+        for succ in block.successors:
+            if succ in dom[block.index]:
+                body = loops.setdefault(succ, {succ})
+                stack = [block.index]
+                while stack:
+                    node = stack.pop()
+                    if node not in body:
+                        body.add(node)
+                        stack.extend(blocks[node].predecessors)
+
+    return sorted((Loop(header, body) for header, body in loops.items()),
+                  key=lambda loop: len(loop.body))
@@ -117,7 +117,7 @@ todo eso. Entonces, espera un poco al principio.
 from collections import ChainMap
 from errors import error
 from cast import *
-from typesys import Type, FloatType, IntType, BoolType, CharType, VoidType
+from typesys import Type, FloatType, IntType, BoolType, CharType, StringType, VoidType, result_type
 import inspect
 
 
@@ -151,7 +151,11 @@ class CheckProgramVisitor(NodeVisitor):
 
         # Put the builtin type names in the symbol table
         # self.symbols.update(builtin_types)
-        self.keywords = {t.name for t in Type.__subclasses__()}
+
+        # Type names are reserved.  StringType is only the type of text
+        # literals: "string" is not a type name in MiniC source, so it
+        # remains a legal identifier
+        self.keywords = {t.name for t in Type.__subclasses__() if t is not StringType}
 
     def visit_Program(self, node):
         self.visit(node.decl_list)
@@ -165,6 +169,21 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_FuncParameter(self, node):
         self.visit(node.datatype)
         node.type = node.datatype.type
+        node.reads = []
+        node.writes = []
+
+    def record_use(self, node, read=True, write=False):
+        # Link a use of a variable to its declaration.  Every variable
+        # declaration (and parameter) gets a list of the nodes that read it
+        # (reads) and of the nodes that assign to it (writes), and every use
+        # gets a reference to its declaration (decl).  The dead code
+        # elimination pass (see deadcode.py) uses these chains.
+        decl = self.symbols[node.name]
+        node.decl = decl
+        if read:
+            decl.reads.append(node)
+        if write:
+            decl.writes.append(node)
 
     def visit_NullStmt(self, node):
         pass
@@ -288,7 +307,9 @@ class CheckProgramVisitor(NodeVisitor):
             self.functions[node.name] = node
             self.visit(node.body)
 
-            if self.current_ret_type != self.expected_ret_type:
+            # A syntax error may have discarded the return statement, so
+            # a function with syntax errors is not checked for it
+            if self.current_ret_type != self.expected_ret_type and not getattr(node, 'syntax_errors', False):
                 # Remove the function name from the table
                 del self.functions[node.name]
 
@@ -303,6 +324,8 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_StaticVarDeclStmt(self, node):
         # Here we must update the symbols table with the new symbol
         node.type = None
+        node.reads = []
+        node.writes = []
 
         # Before anything, if we are declaring a variable with a name that is
         # a typename, then we must fail
@@ -345,6 +368,8 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_StaticArrayDeclStmt(self, node):
         # Here we must update the symbols table with the new symbol
         node.type = None
+        node.reads = []
+        node.writes = []
 
         # Before anything, if we are declaring a variable with a name that is
         # a typename, then we must fail
@@ -380,6 +405,8 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_LocalVarDeclStmt(self, node):
         # Here we must update the symbols table with the new symbol
         node.type = None
+        node.reads = []
+        node.writes = []
 
         # Before anything, if we are declaring a variable with a name that is
         # a typename, then we must fail
@@ -422,6 +449,8 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_LocalArrayDeclStmt(self, node):
         # Here we must update the symbols table with the new symbol
         node.type = None
+        node.reads = []
+        node.writes = []
 
         # Before anything, if we are declaring a variable with a name that is
         # a typename, then we must fail
@@ -468,6 +497,9 @@ class CheckProgramVisitor(NodeVisitor):
     def visit_BoolLiteral(self, node):
         node.type = BoolType
 
+    def visit_StringLiteral(self, node):
+        node.type = StringType
+
     def visit_NewArrayExpr(self, node):
         self.visit(node.datatype)
         self.visit(node.value)
@@ -500,6 +532,7 @@ class CheckProgramVisitor(NodeVisitor):
         self.visit(node.name)
         if node.name in self.symbols:
             node.type = self.symbols[node.name].type
+            self.record_use(node)
         else:
             node.type = None
             error(node.lineno, f"Name '{node.name}' was not defined")
@@ -513,6 +546,7 @@ class CheckProgramVisitor(NodeVisitor):
                 error(node.lineno, f"Index of array '{node.name}' must be '{IntType.name}' type ")
 
             node.type = self.symbols[node.name].type
+            self.record_use(node)
         else:
             node.type = None
             error(node.lineno, f"Name '{node.name}' was not defined")
@@ -527,9 +561,13 @@ class CheckProgramVisitor(NodeVisitor):
 
         # Check and propagate the type of the only operand
         self.visit(node.expr)
+        if node.op in ('++', '--') and hasattr(node.expr, 'decl'):
+            # The operand was already recorded as a read
+            node.decl = node.expr.decl
+            node.decl.writes.append(node)
 
         if node.expr.type:
-            op_type = node.expr.type.unaryop_type(node.op)
+            op_type = result_type(node.op, node.expr.type)
             if not op_type:
                 expr_tname = node.expr.type.name
                 error(node.lineno, f"Unary operation '{node.op} {expr_tname}' not supported")
@@ -545,8 +583,8 @@ class CheckProgramVisitor(NodeVisitor):
         node.type = None
         # Perform various checks here
         if node.left.type and node.right.type:
-            op_type = node.left.type.binop_type(node.op, node.right.type)
-            if (not op_type) or (op_type is FloatType and node.op == '%'):
+            op_type = result_type(node.op, node.left.type, node.right.type)
+            if not op_type:
                 left_tname = node.left.type.name
                 right_tname = node.right.type.name
                 error(node.lineno, f"Binary operation '{left_tname} {node.op} {right_tname}' not supported")
@@ -562,6 +600,8 @@ class CheckProgramVisitor(NodeVisitor):
         node.type = None
         # Check if the variable is already declared
         if node.name in self.symbols:
+            # Compound assignments (+=, ...) also read the variable
+            self.record_use(node, read=node.op != '=', write=True)
             var_type = self.symbols[node.name].type
             if var_type and node.value.type:
                 # If both have type information, then the type checking worked on both branches
@@ -587,6 +627,7 @@ class CheckProgramVisitor(NodeVisitor):
         node.type = None
         # Check if the array is already declared
         if node.name in self.symbols:
+            self.record_use(node, read=node.op != '=', write=True)
             array_type = self.symbols[node.name].type
             if array_type and node.value.type:
                 # If both have type information, then the type checking worked on both branches
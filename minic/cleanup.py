@@ -0,0 +1,124 @@
+# cleanup.py
+"""
+Limpieza del flujo de control
+=============================
+
+La generación de código y las demás pasadas dejan saltos y etiquetas que
+no hacen falta, y cada uno le cuesta al intérprete un despacho:
+
+    BRANCH L4                            (salto a la instrucción siguiente:
+    LABEL  L4                             se elimina el BRANCH)
+
+    LABEL  L1.pre                        (preheader vacío de loopopt.py:
+    LABEL  L1                             los saltos a L1.pre van a L1, y
+                                          se elimina la etiqueta sin uso)
+
+    CMPBRLI <, 0, R1, L5, L6             (salto a un BRANCH: se salta
+    ...                                   directamente al destino final)
+    LABEL  L5
+    BRANCH L9
+
+Como ninguna instrucción de salto continúa con la siguiente, lo que sigue
+a un salto o a un return hasta la próxima etiqueta no se puede ejecutar y
+también se elimina.  Un salto condicional cuyos dos destinos son iguales
+se convierte en un BRANCH.  Las reglas se aplican hasta que no hay
+cambios.
+"""
+
+from cfg import TERMINATORS, label_targets
+from ircode import OpCode, operand_kinds
+
+
+def remove_unreachable(code):
+    """
+    Elimina las instrucciones que siguen a un salto, hasta la próxima
+    etiqueta
+    """
+    result = []
+    reachable = True
+    for instruction in code:
+        if instruction[0] == OpCode.LABEL:
+            reachable = True
+        if reachable:
+            result.append(instruction)
+        if instruction[0] in TERMINATORS:
+            reachable = False
+    return result
+
+
+def labels_at(code, pc):
+    """
+    Devuelve las etiquetas consecutivas a partir de la posición pc, y la
+    posición de la primera instrucción que no es una etiqueta
+    """
+    labels = set()
+    while pc < len(code) and code[pc][0] == OpCode.LABEL:
+        labels.add(code[pc][1])
+        pc += 1
+    return labels, pc
+
+
+def thread_jumps(code):
+    """
+    Reemplaza los destinos de los saltos que llegan a un BRANCH por el
+    destino de ese BRANCH, y los que llegan a un grupo de etiquetas
+    consecutivas por la última del grupo.  Convierte en BRANCH los saltos
+    condicionales con ambos destinos iguales.
+    """
+    forward = {}
+    for pc, instruction in enumerate(code):
+        if instruction[0] == OpCode.LABEL:
+            _, following = labels_at(code, pc)
+            if following < len(code) and code[following][0] == OpCode.BRANCH:
+                forward[instruction[1]] = code[following][1]
+            elif code[following - 1][1] != instruction[1]:
+                forward[instruction[1]] = code[following - 1][1]
+
+    def final(label):
+        seen = set()
+        while label in forward and label not in seen:
+            seen.add(label)
+            label = forward[label]
+        return label
+
+    result = []
+    for instruction in code:
+        if instruction[0] in TERMINATORS:
+            instruction = (instruction[0], *[final(operand) if kind == 'l' else operand
+                                             for kind, operand in zip(operand_kinds(instruction), instruction[1:])])
+            targets = label_targets(instruction)
+            if len(targets) == 2 and targets[0] == targets[1] and instruction[0] not in (OpCode.LOOPLI, OpCode.LOOPGI):
+                instruction = (OpCode.BRANCH, targets[0])
+        result.append(instruction)
+    return result
+
+
+def remove_branches_to_next(code):
+    """
+    Elimina los BRANCH a una etiqueta que está justo después (o separada
+    solo por otras etiquetas)
+    """
+    return [instruction for pc, instruction in enumerate(code)
+            if not (instruction[0] == OpCode.BRANCH and instruction[1] in labels_at(code, pc + 1)[0])]
+
+
+def remove_unused_labels(code):
+    used = {label for instruction in code for label in label_targets(instruction)}
+    return [instruction for instruction in code
+            if instruction[0] != OpCode.LABEL or instruction[1] in used]
+
+
+def clean_control_flow(func):
+    """
+    Aplica la limpieza a una función.  Devuelve la cantidad de
+    instrucciones eliminadas.
+    """
+    size = len(func.code)
+    code = func.code
+    while True:
+        cleaned = remove_unused_labels(remove_branches_to_next(thread_jumps(remove_unreachable(code))))
+        if cleaned == code:
+            break
+        code = cleaned
+    func.code[:] = code
+    return size - len(func.code)
@@ -85,6 +85,29 @@ proyectos posteriores.
 	args : arg_list
 			| empty
 
+Recuperación de errores
+-----------------------
+Después de un error de sintaxis el analizador no se detiene: descarta
+tokens hasta el siguiente ; o } (el token especial error de SLY) y
+continúa, así en una sola pasada se informan todos los errores del
+archivo.  Las reglas de recuperación son:
+
+	decl : error ; | error }
+
+	local_decl : type_spec error ;
+
+	stmt : error ;
+
+	compound_stmt : { local_decls stmt_list error }
+
+Lo que no se pudo analizar se descarta (o queda como una sentencia
+vacía) y el resto del AST se construye normalmente, así el chequeo
+semántico puede revisar las declaraciones que sí se analizaron.  Las
+funciones con errores de sintaxis se marcan con syntax_errors, porque a
+su cuerpo le puede faltar el return.  SLY no
+vuelve a informar errores hasta que se desplazan tres tokens después de
+la recuperación, lo que evita los errores en cascada.
+
 
 Para hacer el proyecto, siga las instrucciones que siguen a continuación.
 """
@@ -134,9 +157,14 @@ class Parser(sly.Parser):
         ("left", '.', '(', ')', '[', ']', INC, DEC)
     )
 
+    def __init__(self):
+        # Posiciones en el fuente de los errores de sintaxis informados
+        self.error_positions = []
+
     @_("decl_list")
     def program(self, p):
-        return Program(p.decl_list)
+        # Las declaraciones con errores de sintaxis quedan como None
+        return Program([decl for decl in p.decl_list if decl is not None])
 
     @_("decl_list decl")
     def decl_list(self, p):
@@ -155,6 +183,10 @@ class Parser(sly.Parser):
     def decl(self, p):
         return p.fun_decl
 
+    @_("error ';'", "error '}'")
+    def decl(self, p):
+        return None
+
     @_("type_spec IDENT ';'")
     def var_decl(self, p):
         return StaticVarDeclStmt(p.type_spec, p.IDENT, None, lineno=p.lineno)
@@ -173,7 +205,11 @@ class Parser(sly.Parser):
 
     @_("type_spec IDENT '(' params ')' compound_stmt")
     def fun_decl(self, p):
-        return FuncDeclStmt(p.type_spec, p.IDENT, p.params, p.compound_stmt, lineno=p.lineno)
+        # Si hubo errores de sintaxis en la función, su cuerpo está
+        # incompleto (ver CheckProgramVisitor.visit_FuncDeclStmt)
+        syntax_errors = any(p.index <= index < p.end for index in self.error_positions)
+        return FuncDeclStmt(p.type_spec, p.IDENT, p.params, p.compound_stmt, lineno=p.lineno,
+                            syntax_errors=syntax_errors)
 
     @_("param_list")
     def params(self, p):
@@ -204,9 +240,15 @@ class Parser(sly.Parser):
     def compound_stmt(self, p):
         return CompoundStmt(p.local_decls, p.stmt_list, lineno=p.lineno)
 
+    @_("'{' local_decls stmt_list error '}'")
+    def compound_stmt(self, p):
+        # Se conservan las sentencias anteriores al error
+        return CompoundStmt(p.local_decls, p.stmt_list, lineno=p.lineno)
+
     @_("local_decls local_decl")
     def local_decls(self, p):
-        p.local_decls.append(p.local_decl)
+        if p.local_decl is not None:
+            p.local_decls.append(p.local_decl)
         return p.local_decls
 
     @_("empty")
@@ -225,6 +267,10 @@ class Parser(sly.Parser):
     def local_decl(self, p):
         return LocalArrayDeclStmt(p.type_spec, p.IDENT, p.expr, lineno=p.lineno)
 
+    @_("type_spec error ';'")
+    def local_decl(self, p):
+        return None
+
     @_("stmt_list stmt")
     def stmt_list(self, p):
         p.stmt_list.append(p.stmt)
@@ -247,6 +293,10 @@ class Parser(sly.Parser):
     def expr_stmt(self, p):
         return NullStmt(None, lineno=p.lineno)
 
+    @_("error ';'")
+    def stmt(self, p):
+        return NullStmt(None, lineno=p.lineno)
+
     @_("WHILE '(' expr ')' stmt")
     def while_stmt(self, p):
         return WhileStmt(p.expr, p.stmt, lineno=p.lineno)
@@ -379,11 +429,13 @@ class Parser(sly.Parser):
     #
     # manejo de errores catch-all. Se llama a la siguiente función en
     # cualquier entrada incorrecta. p es el token ofensivo o None si
-    # el final de archivo (EOF).
+    # el final de archivo (EOF).  Después de informar el error, SLY
+    # continúa con las reglas que usan el token error (ver arriba).
 
     def error(self, p):
         if p:
             error(p.lineno, "Syntax error in input at token '%s'" % p.value)
+            self.error_positions.append(p.index)
         else:
             error("EOF", "Syntax error. No more input.")
 
@@ -0,0 +1,189 @@
+# deadcode.py
+"""
+Eliminación de código muerto
+============================
+
+Pasada sobre el AST, después del chequeo de tipos, que elimina:
+
+*   Las asignaciones a variables locales (o parámetros) que nunca se
+    leen, como OP = 55 en c_programs/test.c.  Si el valor asignado tiene
+    efectos (una llamada, otra asignación), se conserva solo la expresión.
+
+*   Las declaraciones de esas variables, si ya no queda ninguna escritura
+    y su valor inicial no tiene efectos.
+
+*   Las sentencias que siguen a un break o un return dentro del mismo
+    bloque, que nunca se ejecutan.
+
+Para saber qué variables se leen se usan las cadenas de uso y definición
+que arma CheckProgramVisitor (ver checker.py): cada declaración tiene la
+lista de nodos que la leen (reads) y que le asignan (writes).  Como al
+borrar una sentencia pueden quedar sin lecturas otras variables (por
+ejemplo, borrar y = x deja sin usos a x), el proceso se repite en cada
+función hasta que no hay cambios.
+
+Las variables globales y los arreglos no se eliminan.  Las expresiones
+que pueden fallar (divisiones, accesos a arreglos) se consideran con
+efectos, así eliminar código nunca cambia el comportamiento del programa.
+"""
+
+import cast
+
+
+class Effects(cast.NodeVisitor):
+    """
+    Determina si una expresión tiene efectos o puede fallar
+    """
+
+    def __init__(self):
+        self.found = False
+
+    def visit_FuncCallExpr(self, node):
+        self.found = True
+
+    def visit_VarAssignmentExpr(self, node):
+        self.found = True
+
+    def visit_ArrayAssignmentExpr(self, node):
+        self.found = True
+
+    def visit_ArrayExpr(self, node):
+        self.found = True
+
+    def visit_UnaryOpExpr(self, node):
+        if node.op in ('++', '--'):
+            self.found = True
+        self.visit(node.expr)
+
+    def visit_BinaryOpExpr(self, node):
+        if node.op in ('/', '%') and not (isinstance(node.right, cast.Literal) and node.right.value):
+            self.found = True
+        self.visit(node.left)
+        self.visit(node.right)
+
+
+def has_effects(expr):
+    effects = Effects()
+    effects.visit(expr)
+    return effects.found
+
+
+class Uses(cast.NodeVisitor):
+    """
+    Recoge los nodos de un fragmento del AST que leen o escriben variables
+    """
+
+    def __init__(self):
+        self.nodes = []
+
+    def generic_visit(self, node):
+        if hasattr(node, 'decl'):
+            self.nodes.append(node)
+        super().generic_visit(node)
+
+
+class DeadCodeEliminator:
+    """
+    Elimina el código muerto de cada función del programa
+    """
+
+    def __init__(self):
+        self.removed = 0
+        self.changed = False
+
+    def unlink(self, node):
+        decl = node.decl
+        decl.reads = [other for other in decl.reads if other is not node]
+        decl.writes = [other for other in decl.writes if other is not node]
+
+    def forget(self, fragment):
+        """
+        Quita de las cadenas de uso y definición los nodos de un fragmento
+        del AST que se eliminó
+        """
+        uses = Uses()
+        uses.visit(fragment)
+        for node in uses.nodes:
+            self.unlink(node)
+        self.removed += 1
+        self.changed = True
+
+    def dead_store(self, stmt):
+        """
+        Indica si stmt es una asignación a una variable que nunca se lee
+        """
+        return (isinstance(stmt, cast.ExprStmt) and isinstance(stmt.value, cast.VarAssignmentExpr)
+                and stmt.value.op == '=' and hasattr(stmt.value, 'decl')
+                and not isinstance(stmt.value.decl, (cast.StaticVarDeclStmt, cast.StaticArrayDeclStmt))
+                and not stmt.value.decl.reads)
+
+    def dead_declaration(self, decl):
+        return (isinstance(decl, cast.LocalVarDeclStmt) and not decl.reads and not decl.writes
+                and (decl.value is None or not has_effects(decl.value)))
+
+    def prune(self, stmt):
+        """
+        Devuelve la sentencia sin su código muerto, o None si toda la
+        sentencia es código muerto
+        """
+        if isinstance(stmt, cast.CompoundStmt):
+            stmt.stmt_list = self.prune_list(stmt.stmt_list)
+            decls = []
+            for decl in stmt.decl:
+                if self.dead_declaration(decl):
+                    self.forget(decl)
+                else:
+                    decls.append(decl)
+            stmt.decl = decls
+        elif isinstance(stmt, cast.IfStmt):
+            stmt.true_block = self.prune_body(stmt.true_block)
+            if stmt.false_block is not None:
+                stmt.false_block = self.prune_body(stmt.false_block)
+        elif isinstance(stmt, (cast.WhileStmt, cast.ForStmt)):
+            stmt.body = self.prune_body(stmt.body)
+        elif self.dead_store(stmt):
+            value = stmt.value.value
+            if has_effects(value):
+                # Se conserva la evaluación del valor
+                self.unlink(stmt.value)
+                self.removed += 1
+                self.changed = True
+                return cast.ExprStmt(value, lineno=getattr(stmt, 'lineno', None))
+            self.forget(stmt)
+            return None
+        return stmt
+
+    def prune_body(self, stmt):
+        pruned = self.prune(stmt)
+        return pruned if pruned is not None else cast.NullStmt(None)
+
+    def prune_list(self, statements):
+        result = []
+        for n, stmt in enumerate(statements):
+            pruned = self.prune(stmt)
+            if pruned is not None:
+                result.append(pruned)
+            if isinstance(stmt, (cast.BreakStmt, cast.ReturnStmt)):
+                # Lo que sigue en el bloque nunca se ejecuta
+                for unreachable in statements[n + 1:]:
+                    self.forget(unreachable)
+                break
+        return result
+
+    def visit_function(self, func):
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            func.body = self.prune_body(func.body)
+
+
+def eliminate_dead_code(ast):
+    """
+    Elimina el código muerto del programa.  Devuelve la cantidad de
+    sentencias y declaraciones eliminadas.
+    """
+    eliminator = DeadCodeEliminator()
+    for decl in ast.decl_list:
+        if isinstance(decl, cast.FuncDeclStmt):
+            eliminator.visit_function(decl)
+    return eliminator.removed
@@ -0,0 +1,110 @@
+# immediates.py
+"""
+Operandos inmediatos
+====================
+
+Cada literal del programa se carga en un registro con MOVI, MOVF o MOVB
+antes de usarlo, aunque su único uso sea una suma o una comparación.
+Esta pasada reemplaza las instrucciones aritméticas, de comparación y de
+escritura de variables cuyo operando es una constante por su variante
+con operando inmediato (ver la especificación en ircode.py):
+
+    MOVI   1, R2
+    ADDI   R1, R2, R3        ==>     ADDKI  R1, 1, R3
+
+    MOVI   0, R1
+    STORELI R1, 4            ==>     STORELKI 0, 4
+
+    MOVI   10, R2
+    BLTI   R1, R2, L1, L2    ==>     CMPBRKI <, R1, 10, L1, L2
+
+En las operaciones conmutativas (suma y producto) y en las comparaciones
+la constante puede estar a la izquierda; las comparaciones invierten el
+operador.  x - k se escribe como x + (-k).  Después se eliminan los MOV
+que quedaron sin usar.
+
+Las constantes se reconocen como en peephole.py: registros definidos una
+sola vez por un MOV, así que la pasada debe ejecutarse antes de asignar
+registros.
+"""
+
+from collections import Counter
+from cfg import uses_defs, COMPARE_BRANCH_OPS
+from ircode import OpCode, SWAPPED_COMPARE_OPS
+from peephole import remove_dead_code
+
+MOVES = {OpCode.MOVI, OpCode.MOVF, OpCode.MOVB}
+
+# Operación con un registro -> misma operación con un inmediato a la derecha
+BINARY_FORMS = {
+    OpCode.ADDI: OpCode.ADDKI, OpCode.ADDF: OpCode.ADDKF,
+    OpCode.MULI: OpCode.MULKI, OpCode.MULF: OpCode.MULKF,
+    OpCode.DIVI: OpCode.DIVKI, OpCode.DIVF: OpCode.DIVKF,
+    OpCode.REMI: OpCode.REMKI,
+}
+COMMUTATIVE = {OpCode.ADDI, OpCode.ADDF, OpCode.MULI, OpCode.MULF}
+
+COMPARE_FORMS = {OpCode.CMPI: OpCode.CMPKI, OpCode.CMPF: OpCode.CMPKF, OpCode.CMPB: OpCode.CMPKB}
+
+STORE_FORMS = {
+    OpCode.STORELI: OpCode.STORELKI, OpCode.STORELF: OpCode.STORELKF, OpCode.STORELB: OpCode.STORELKB,
+    OpCode.STOREGI: OpCode.STOREGKI, OpCode.STOREGF: OpCode.STOREGKF, OpCode.STOREGB: OpCode.STOREGKB,
+}
+
+# Saltos que comparan dos registros: código -> (operador, variante inmediata)
+BRANCH_FORMS = {op_code: (op, OpCode['CMPBRK' + suffix]) for op_code, (op, suffix) in COMPARE_BRANCH_OPS.items()}
+
+
+def immediate_form(instruction, constants):
+    """
+    Devuelve la instrucción con su operando constante como inmediato, o
+    la misma instrucción si no tiene ninguno
+    """
+    op_code = instruction[0]
+    if op_code in BINARY_FORMS or op_code in (OpCode.SUBI, OpCode.SUBF):
+        _, left, right, target = instruction
+        if op_code in (OpCode.SUBI, OpCode.SUBF):
+            if right in constants:
+                add = OpCode.ADDKI if op_code == OpCode.SUBI else OpCode.ADDKF
+                return add, left, -constants[right], target
+        elif right in constants:
+            return BINARY_FORMS[op_code], left, constants[right], target
+        elif op_code in COMMUTATIVE and left in constants:
+            return BINARY_FORMS[op_code], right, constants[left], target
+
+    elif op_code in COMPARE_FORMS:
+        _, op, left, right, target = instruction
+        if right in constants:
+            return COMPARE_FORMS[op_code], op, left, constants[right], target
+        if left in constants:
+            return COMPARE_FORMS[op_code], SWAPPED_COMPARE_OPS[op], right, constants[left], target
+
+    elif op_code in BRANCH_FORMS:
+        op, branch = BRANCH_FORMS[op_code]
+        _, left, right, true_label, false_label = instruction
+        if right in constants:
+            return branch, op, left, constants[right], true_label, false_label
+        if left in constants:
+            return branch, SWAPPED_COMPARE_OPS[op], right, constants[left], true_label, false_label
+
+    elif op_code in STORE_FORMS:
+        _, source, slot = instruction
+        if source in constants:
+            return STORE_FORMS[op_code], constants[source], slot
+
+    return instruction
+
+
+def use_immediates(func):
+    """
+    Aplica la pasada a una función.  Devuelve la cantidad de instrucciones
+    eliminadas.
+    """
+    size = len(func.code)
+    def_counts = Counter(reg for instruction in func.code for reg in uses_defs(instruction)[1])
+    constants = {instruction[2]: instruction[1] for instruction in func.code
+                 if instruction[0] in MOVES and def_counts[instruction[2]] == 1}
+
+    code = [immediate_form(instruction, constants) for instruction in func.code]
+    func.code[:] = remove_dead_code(code)
+    return size - len(func.code)
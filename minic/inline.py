@@ -0,0 +1,174 @@
+# inline.py
+"""
+Expansión en línea de funciones
+===============================
+
+Cada CALL crea un marco nuevo en el intérprete (registros y variables
+locales), lo que cuesta mucho más que las pocas instrucciones de una
+función auxiliar típica.  Esta pasada reemplaza las llamadas a funciones
+pequeñas por una copia de su código:
+
+    CALL   square, R4, R5            STORELI R4, 3        (si el parámetro
+                                     LOADLI  3, R9         se modifica)
+                             ==>     ...
+                                     COPY    R9, R5        (en lugar de RET)
+                                     BRANCH  L7
+                                     LABEL   L7
+
+Solo se expanden las funciones hoja (que no llaman a otras funciones, y
+por lo tanto no son recursivas) de hasta MAX_INLINE_SIZE instrucciones.
+Las funciones se procesan en orden, así que una función que queda como
+hoja después de expandir sus llamadas puede a su vez expandirse en las
+siguientes.
+
+Los registros y etiquetas de la copia se renombran con new_register() y
+new_label() del generador de código, para que el resultado siga en forma
+SSA.  Las variables locales de la función llamada se agregan al final de
+las de la función que llama.  Los parámetros que la función nunca
+modifica no se guardan: sus cargas se reemplazan por copias del registro
+del argumento, que luego elimina la simplificación algebraica (ver
+peephole.py).
+"""
+
+from ircode import OpCode, operand_kinds
+
+MAX_INLINE_SIZE = 40
+
+# Prefijos de las instrucciones cuyo slot es una variable local
+_LOCAL_SLOT_PREFIXES = ('ALLOC', 'AALLOC', 'LOADL', 'STOREL', 'ALOADL', 'ASTOREL', 'LOOPL',
+                        'INCL', 'ADDL', 'CMPBRL', 'AREFL')
+LOCAL_SLOT_OPS = {op for op in OpCode if op.name.startswith(_LOCAL_SLOT_PREFIXES)}
+LOCAL_LOADS = {OpCode.LOADLI, OpCode.LOADLF, OpCode.LOADLB}
+LOCAL_STORES = {OpCode.STORELI, OpCode.STORELF, OpCode.STORELB,
+                OpCode.STORELKI, OpCode.STORELKF, OpCode.STORELKB}
+LOCAL_WRITES = LOCAL_STORES | {OpCode.LOOPLI, OpCode.INCLI, OpCode.INCLF, OpCode.ADDLI, OpCode.ADDLF}
+
+STORE_LOCAL = {'I': OpCode.STORELI, 'F': OpCode.STORELF, 'B': OpCode.STORELB}
+
+
+class InlineSite:
+    """
+    Resultado de examinar una llamada: si se expandió, o el motivo por el
+    que no
+    """
+
+    def __init__(self, caller, callee, number, size, reason=None):
+        self.caller = caller
+        self.callee = callee
+        self.number = number  # número de la llamada dentro de caller
+        self.size = size
+        self.reason = reason
+
+    @property
+    def inlined(self):
+        return self.reason is None
+
+    def __str__(self):
+        status = 'inlined' if self.inlined else f'not inlined ({self.reason})'
+        return f"{self.caller}: call #{self.number} to {self.callee} ({self.size} instructions) {status}"
+
+
+def function_size(func):
+    return sum(1 for instruction in func.code if instruction[0] != OpCode.LABEL)
+
+
+def rejection_reason(caller, callee, max_size):
+    """
+    Devuelve por qué no se puede expandir la llamada, o None
+    """
+    calls = {instruction[1] for instruction in callee.code if instruction[0] == OpCode.CALL}
+    if callee is caller or callee.name in calls:
+        return 'recursive'
+    if calls:
+        return 'not a leaf'
+    if function_size(callee) > max_size:
+        return 'too large'
+    return None
+
+
+def expand_call(call, caller, callee, gen):
+    """
+    Devuelve el código que reemplaza a la instrucción CALL
+    """
+    _, _, *arguments, target = call
+    base = len(caller.locals)
+    caller.locals.extend(f"{callee.name}.{name}" for name in callee.locals)
+
+    # Los parámetros de solo lectura no necesitan un slot
+    written = {instruction[2] if instruction[0] in LOCAL_STORES else instruction[1]
+               for instruction in callee.code if instruction[0] in LOCAL_WRITES}
+    code = [(STORE_LOCAL[ptype], argument, base + n)
+            for n, ((_, ptype), argument) in enumerate(zip(callee.parameters, arguments))
+            if n in written]
+
+    registers = {}
+    labels = {}
+    end_label = gen.new_label()
+
+    def rename(kind, operand):
+        if kind in 'rw':
+            if operand not in registers:
+                registers[operand] = gen.new_register()
+            return registers[operand]
+        if kind == 'l':
+            if operand not in labels:
+                labels[operand] = gen.new_label()
+            return labels[operand]
+        return operand
+
+    for n, instruction in enumerate(callee.code):
+        op_code = instruction[0]
+        last = n == len(callee.code) - 1
+        if op_code == OpCode.RET:
+            code.append((OpCode.COPY, rename('r', instruction[1]), target))
+            if not last:
+                code.append((OpCode.BRANCH, end_label))
+        elif op_code == OpCode.RETV:
+            if not last:
+                code.append((OpCode.BRANCH, end_label))
+        elif op_code in LOCAL_LOADS and instruction[1] < len(arguments) and instruction[1] not in written:
+            code.append((OpCode.COPY, arguments[instruction[1]], rename('w', instruction[2])))
+        else:
+            kinds = operand_kinds(instruction)
+            operands = [rename(kind, operand) for kind, operand in zip(kinds, instruction[1:])]
+            if op_code in LOCAL_SLOT_OPS:
+                slot = kinds.index('s')
+                operands[slot] += base
+            code.append((op_code, *operands))
+
+    code.append((OpCode.LABEL, end_label))
+    return code
+
+
+def inline_functions(functions, gen, max_size=MAX_INLINE_SIZE):
+    """
+    Expande las llamadas a funciones pequeñas en todas las funciones del
+    programa.  Devuelve una lista de InlineSite con el resultado de cada
+    llamada examinada.
+    """
+    by_name = {func.name: func for func in functions}
+    report = []
+    for caller in functions:
+        # Los slots de __minic_init son las variables globales
+        if caller.name == '__minic_init':
+            continue
+
+        code = []
+        number = 0
+        for instruction in caller.code:
+            if instruction[0] != OpCode.CALL or instruction[1] not in by_name:
+                code.append(instruction)
+                continue
+
+            number += 1
+            callee = by_name[instruction[1]]
+            site = InlineSite(caller.name, callee.name, number, function_size(callee),
+                              rejection_reason(caller, callee, max_size))
+            report.append(site)
+            if site.inlined:
+                code.extend(expand_call(instruction, caller, callee, gen))
+            else:
+                code.append(instruction)
+        caller.code[:] = code
+
+    return report
@@ -11,8 +11,55 @@ Para ejecutar un programa utiliza:
 
     bash % python3 -m interp someprogram.c
 
+Con --profile se muestra al terminar cuántas veces se ejecutó cada
+código de operación y el tiempo acumulado, las llamadas, instrucciones y
+tiempo propio de cada función, y las etiquetas más visitadas.  Con
+--profile-json los mismos datos se guardan en un archivo JSON:
+
+    bash % python3 -m interp --profile --profile-json prof.json someprogram.c
+
+La salida del programa se acumula en un buffer (ver output.py); con
+--flush se elige si se escribe por bloques (size, por defecto), en cada
+salto de línea (newline) o solo al terminar (exit).
+
+Los enteros del intérprete son los de Python, sin límite de tamaño, y la
+división redondea hacia abajo.  Con --int-bits 32 o --int-bits 64 se usa
+la aritmética entera de C: los resultados se truncan a ese ancho en
+complemento a dos, la división y el resto truncan hacia cero y los
+arreglos de enteros y de floats se guardan en array.array con elementos
+del ancho elegido:
+
+    bash % python3 -m interp --int-bits 32 someprogram.c
+
+Los ciclos que se repiten más de --jit-threshold veces se compilan a
+funciones de Python (ver jit.py); --no-jit ejecuta todo el programa con
+el ciclo genérico.
+
 """
+import json
+import operator
 import sys
+import time
+from array import array
+from collections import defaultdict
+from ircode import OpCode, PackedProgram, pack, decode, operand_kinds
+from jit import JIT_THRESHOLD, compile_loop, find_loops
+from output import OutputSink, FLUSH_POLICIES
+from vectorize import elementwise, reduce_sum
+
+# Operadores de las instrucciones CMP
+CMP_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Tipo de los elementos de array.array de los arreglos de enteros, según
+# el ancho de --int-bits
+INT_TYPECODES = {32: 'i', 64: 'q'}
 
 
 class Interpreter(object):
@@ -31,29 +78,169 @@ class Interpreter(object):
 
     La clase ejecuta los métodos self.run_opcode(args).  Por ejemplo:
 
-        self.run_MOVI(1, 'R1')
-        self.run_MOVI(2, 'R2')
-        self.run_ADDI('R1','R2','R3')
-        self.run_PRINTI('R3')
+        self.run_MOVI(1, 1)
+        self.run_MOVI(2, 2)
+        self.run_ADDI(1, 2, 3)
+        self.run_PRINTI(3)
+
+    El código se recibe en su codificación compacta (PackedProgram) o se
+    empaqueta antes de ejecutarlo, así los registros llegan como enteros.
+    Los métodos se resuelven una sola vez por instrucción, usando el número
+    del código de operación, y las etiquetas se convierten en la posición
+    de la instrucción LABEL.  Los registros de cada función se renumeran
+    desde 0 para guardarlos en una lista del tamaño justo.
+    Cada llamada a función crea un nuevo marco con sus propios registros y
+    una lista de variables locales indexada por slot.  Las variables
+    globales se guardan en una lista indexada por slot común a todo el
+    programa.
+
+    Con int_bits (32 o 64) las instrucciones enteras que pueden salirse de
+    rango se resuelven con los métodos wrap_opcode en lugar de run_opcode,
+    y las constantes enteras se truncan una sola vez, al resolver el
+    código.  El resto de las instrucciones no cambia, así el modo normal
+    no paga ningún costo.  El código debe compilarse con el mismo
+    int_bits (ver compile_ircode), porque algunas simplificaciones de
+    peephole.py solo valen para enteros sin límite.
+
+    Con jit_threshold, los saltos hacia atrás de cada ciclo cuentan sus
+    vueltas y los ciclos calientes se ejecutan con el código que genera
+    jit.py.  Con jit_threshold=None no se compila nada.
     """
 
-    def __init__(self):
+    def __init__(self, output=None, int_bits=None, jit_threshold=JIT_THRESHOLD):
         # Registers
-        self.registers = {}
+        self.registers = []
+
+        # Destino de las instrucciones PRINT (ver output.py)
+        self.output = output if output is not None else OutputSink()
 
         # Global variables storage
-        self.global_vars = {}
+        self.global_vars = []
 
         # Local variables storage
-        self.local_vars = {}
+        self.local_vars = []
+
+        # Funciones del programa y su código con los métodos ya resueltos
+        self.functions = {}
+        self.code = {}
+
+        # Cantidad de registros que usa cada función
+        self.register_counts = {}
+
+        # Instrucciones resueltas de cada función, como (código, operandos),
+        # para compilar sus ciclos
+        self.jit_threshold = jit_threshold
+        self.instructions = {}
+
+        # Método de cada código de operación, indexado por su número
+        self.handlers = [getattr(self, f'run_{op_code.name}') for op_code in OpCode]
+
+        # Aritmética entera de ancho fijo: un valor v se trunca con
+        # ((v + int_bias) & int_mask) - int_bias
+        self.int_bits = int_bits
+        if int_bits is not None:
+            if int_bits not in INT_TYPECODES:
+                raise ValueError(f"unsupported integer width {int_bits}")
+            self.int_bias = 1 << (int_bits - 1)
+            self.int_mask = (1 << int_bits) - 1
+            for op_code in OpCode:
+                self.handlers[op_code] = getattr(self, f'wrap_{op_code.name}', self.handlers[op_code])
+
+        # Contador de programa de la función actual y valor de retorno
+        self.pc = None
+        self.return_value = None
 
     def execute(self, code):
-        for function in code:
-            self.local_vars = {}
-            for inst, *args in function:
-                getattr(self, f'run_{inst}')(*args)
-            print("locals: ", self.local_vars)
-        print("gobals: ", self.global_vars)
+        program = code if isinstance(code, PackedProgram) else pack(code)
+        for function in program.functions:
+            self.functions[function.name] = function
+            self.code[function.name] = self.resolve(program, function)
+
+        init = self.functions['__minic_init']
+        self.global_vars = [None] * len(init.locals)
+        try:
+            self.call('__minic_init', [])
+            if '__minic_main' in self.functions:
+                self.call('__minic_main', [])
+        finally:
+            self.output.flush()
+
+    def resolve(self, program, function):
+        """
+        Reemplaza cada instrucción por el método que la ejecuta y sus operandos
+        """
+        instructions = []
+        positions = {}
+        for position, op_code, operands in decode(program, function):
+            positions[position] = len(instructions)
+            instructions.append((op_code, operands))
+
+        registers = {}
+        code = []
+        resolved = []
+        for op_code, operands in instructions:
+            kinds = operand_kinds((op_code, *operands))
+            integer = self.int_bits is not None and OpCode(op_code).name.endswith('I')
+            operands = [registers.setdefault(operand, len(registers)) if kind in 'rw' else
+                        positions[operand] if kind == 'l' else
+                        CMP_OPERATORS[operand] if kind == 'o' else
+                        self.wrap(operand) if kind == 'v' and integer else operand
+                        for kind, operand in zip(kinds, operands)]
+            code.append((self.handlers[op_code], operands))
+            resolved.append((op_code, operands))
+
+        # Las funciones void pueden terminar sin una instrucción RET
+        code.append((self.run_RETV, ()))
+        resolved.append((OpCode.RETV, []))
+        self.register_counts[function.name] = len(registers)
+
+        if self.jit_threshold is not None:
+            self.instructions[function.name] = resolved
+            for pc, loop in find_loops(function.name, resolved).items():
+                method, args = code[pc]
+                code[pc] = (self.back_edge, (loop, method, args))
+        return code
+
+    def call(self, name, args):
+        code = self.code[name]
+
+        # Guardar el marco de la función que hace la llamada
+        frame = (self.registers, self.local_vars, self.pc)
+        self.registers = [None] * self.register_counts[name]
+        self.local_vars = [None] * len(self.functions[name].locals)
+        self.local_vars[:len(args)] = args
+
+        self.pc = 0
+        while self.pc is not None:
+            method, args = code[self.pc]
+            self.pc += 1
+            method(*args)
+
+        self.registers, self.local_vars, self.pc = frame
+        return self.return_value
+
+    def back_edge(self, loop, method, args):
+        """
+        Ejecuta un salto hacia atrás y cuenta una vuelta del ciclo si
+        salta a su cabecera
+        """
+        method(*args)
+        if self.pc == loop.header and not loop.disabled:
+            loop.count += 1
+            if loop.count >= self.jit_threshold:
+                self.run_compiled(loop)
+
+    def run_compiled(self, loop):
+        """
+        Ejecuta el ciclo con su código compilado, desde la cabecera
+        """
+        if loop.compiled is None:
+            loop.compiled = compile_loop(loop, self.instructions[loop.function], self.int_bits)
+            if loop.compiled is None:
+                loop.disabled = True
+                return
+
+        self.pc = loop.compiled(self, self.registers, self.local_vars, self.global_vars)
 
     # Interpreter opcodes
 
@@ -87,51 +274,536 @@ class Interpreter(object):
     def run_REMI(self, left, right, target):
         self.registers[target] = self.registers[left] % self.registers[right]
 
+    def run_NEGI(self, source, target):
+        self.registers[target] = -self.registers[source]
+
+    run_NEGF = run_NEGI
+
+    def run_SHLI(self, source, value, target):
+        self.registers[target] = self.registers[source] << value
+
+    def run_SHRI(self, source, value, target):
+        self.registers[target] = self.registers[source] >> value
+
+    def run_MASKI(self, source, value, target):
+        self.registers[target] = self.registers[source] & value
+
+    def run_COPY(self, source, target):
+        self.registers[target] = self.registers[source]
+
+    def run_AND(self, left, right, target):
+        self.registers[target] = self.registers[left] & self.registers[right]
+
+    def run_OR(self, left, right, target):
+        self.registers[target] = self.registers[left] | self.registers[right]
+
     def run_XOR(self, left, right, target):
         self.registers[target] = self.registers[left] ^ self.registers[right]
 
+    def run_CMPI(self, op, left, right, target):
+        self.registers[target] = int(op(self.registers[left], self.registers[right]))
+
+    run_CMPF = run_CMPI
+    run_CMPB = run_CMPI
+
     def run_PRINTI(self, value):
-        print(self.registers[value])
+        self.output.write(f"{self.registers[value]}\n")
 
     run_PRINTF = run_PRINTI
 
     def run_PRINTB(self, value):
-        print(chr(self.registers[value]), end='')
-        sys.stdout.flush()
+        self.output.write(chr(self.registers[value]))
+
+    def run_PRINTS(self, text):
+        self.output.write(text)
 
-    def run_VARI(self, name):
-        self.global_vars[name] = 0
+    def run_VARI(self, slot):
+        self.global_vars[slot] = 0
 
-    def run_VARF(self, name):
-        self.global_vars[name] = 0.0
+    def run_VARF(self, slot):
+        self.global_vars[slot] = 0.0
 
     run_VARB = run_VARI
 
-    def run_ALLOCI(self, name):
-        self.local_vars[name] = 0
+    def run_ALLOCI(self, slot):
+        self.local_vars[slot] = 0
+
+    def run_ALLOCF(self, slot):
+        self.local_vars[slot] = 0.0
+
+    run_ALLOCB = run_ALLOCI
+
+    def run_AVARI(self, slot, size):
+        self.global_vars[slot] = [0] * self.registers[size]
+
+    def run_AVARF(self, slot, size):
+        self.global_vars[slot] = [0.0] * self.registers[size]
+
+    run_AVARB = run_AVARI
+
+    def run_AALLOCI(self, slot, size):
+        self.local_vars[slot] = [0] * self.registers[size]
+
+    def run_AALLOCF(self, slot, size):
+        self.local_vars[slot] = [0.0] * self.registers[size]
+
+    run_AALLOCB = run_AALLOCI
+
+    def run_LOADLI(self, slot, target):
+        self.registers[target] = self.local_vars[slot]
+
+    run_LOADLF = run_LOADLI
+    run_LOADLB = run_LOADLI
+
+    def run_LOADGI(self, slot, target):
+        self.registers[target] = self.global_vars[slot]
+
+    run_LOADGF = run_LOADGI
+    run_LOADGB = run_LOADGI
+
+    def run_STORELI(self, source, slot):
+        self.local_vars[slot] = self.registers[source]
+
+    run_STORELF = run_STORELI
+    run_STORELB = run_STORELI
+
+    def run_STOREGI(self, source, slot):
+        self.global_vars[slot] = self.registers[source]
+
+    run_STOREGF = run_STOREGI
+    run_STOREGB = run_STOREGI
+
+    def run_ALOADLI(self, slot, index, target):
+        self.registers[target] = self.local_vars[slot][self.registers[index]]
+
+    run_ALOADLF = run_ALOADLI
+    run_ALOADLB = run_ALOADLI
+
+    def run_ALOADGI(self, slot, index, target):
+        self.registers[target] = self.global_vars[slot][self.registers[index]]
+
+    run_ALOADGF = run_ALOADGI
+    run_ALOADGB = run_ALOADGI
+
+    def run_ASTORELI(self, source, slot, index):
+        self.local_vars[slot][self.registers[index]] = self.registers[source]
+
+    run_ASTORELF = run_ASTORELI
+    run_ASTORELB = run_ASTORELI
+
+    def run_ASTOREGI(self, source, slot, index):
+        self.global_vars[slot][self.registers[index]] = self.registers[source]
+
+    run_ASTOREGF = run_ASTOREGI
+    run_ASTOREGB = run_ASTOREGI
+
+    def run_LABEL(self, name):
+        pass
+
+    def run_BRANCH(self, label):
+        self.pc = label
+
+    def run_CBRANCH(self, test, true_label, false_label):
+        self.pc = true_label if self.registers[test] else false_label
+
+    def run_BLTI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] < self.registers[right] else false_label
+
+    def run_BLEI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] <= self.registers[right] else false_label
+
+    def run_BGTI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] > self.registers[right] else false_label
+
+    def run_BGEI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] >= self.registers[right] else false_label
+
+    def run_BEQI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] == self.registers[right] else false_label
+
+    def run_BNEI(self, left, right, true_label, false_label):
+        self.pc = true_label if self.registers[left] != self.registers[right] else false_label
+
+    run_BLTF = run_BLTB = run_BLTI
+    run_BLEF = run_BLEB = run_BLEI
+    run_BGTF = run_BGTB = run_BGTI
+    run_BGEF = run_BGEB = run_BGEI
+    run_BEQF = run_BEQB = run_BEQI
+    run_BNEF = run_BNEB = run_BNEI
+
+    def run_LOOPLI(self, slot, step, bound, op, body_label, exit_label):
+        value = self.local_vars[slot] + step
+        self.local_vars[slot] = value
+        self.pc = body_label if op(value, self.registers[bound]) else exit_label
+
+    def run_LOOPGI(self, slot, step, bound, op, body_label, exit_label):
+        value = self.global_vars[slot] + step
+        self.global_vars[slot] = value
+        self.pc = body_label if op(value, self.registers[bound]) else exit_label
+
+    def run_INCLI(self, slot, value):
+        self.local_vars[slot] += value
+
+    run_INCLF = run_INCLI
+
+    def run_INCGI(self, slot, value):
+        self.global_vars[slot] += value
+
+    run_INCGF = run_INCGI
+
+    def run_ADDLI(self, slot, source):
+        self.local_vars[slot] += self.registers[source]
+
+    run_ADDLF = run_ADDLI
+
+    def run_ADDGI(self, slot, source):
+        self.global_vars[slot] += self.registers[source]
 
-    def run_ALLOCF(self, name):
-        self.local_vars[name] = 0.0
+    run_ADDGF = run_ADDGI
 
-    run_ALLOCB = run_VARI
+    def run_CMPBRLI(self, op, slot, right, true_label, false_label):
+        self.pc = true_label if op(self.local_vars[slot], self.registers[right]) else false_label
 
-    def run_LOADI(self, name, target):
-        if name in self.local_vars:
-            self.registers[target] = self.local_vars[name]
-        else:
-            self.registers[target] = self.global_vars[name]
+    run_CMPBRLF = run_CMPBRLB = run_CMPBRLI
 
-    run_LOADF = run_LOADI
-    run_LOADB = run_LOADI
+    def run_CMPBRGI(self, op, slot, right, true_label, false_label):
+        self.pc = true_label if op(self.global_vars[slot], self.registers[right]) else false_label
 
-    def run_STOREI(self, target, name):
-        if name in self.local_vars:
-            self.local_vars[name] = self.registers[target]
-        else:
-            self.global_vars[name] = self.registers[target]
+    run_CMPBRGF = run_CMPBRGB = run_CMPBRGI
 
-    run_STOREF = run_STOREI
-    run_STOREB = run_STOREI
+    def run_ADDKI(self, source, value, target):
+        self.registers[target] = self.registers[source] + value
+
+    run_ADDKF = run_ADDKI
+
+    def run_MULKI(self, source, value, target):
+        self.registers[target] = self.registers[source] * value
+
+    run_MULKF = run_MULKI
+
+    def run_DIVKI(self, source, value, target):
+        self.registers[target] = self.registers[source] // value
+
+    def run_DIVKF(self, source, value, target):
+        self.registers[target] = self.registers[source] / value
+
+    def run_REMKI(self, source, value, target):
+        self.registers[target] = self.registers[source] % value
+
+    def run_CMPKI(self, op, left, value, target):
+        self.registers[target] = int(op(self.registers[left], value))
+
+    run_CMPKF = run_CMPKB = run_CMPKI
+
+    def run_CMPBRKI(self, op, left, value, true_label, false_label):
+        self.pc = true_label if op(self.registers[left], value) else false_label
+
+    run_CMPBRKF = run_CMPBRKB = run_CMPBRKI
+
+    def run_STORELKI(self, value, slot):
+        self.local_vars[slot] = value
+
+    run_STORELKF = run_STORELKB = run_STORELKI
+
+    def run_STOREGKI(self, value, slot):
+        self.global_vars[slot] = value
+
+    run_STOREGKF = run_STOREGKB = run_STOREGKI
+
+    def run_AREFL(self, slot, target):
+        self.registers[target] = self.local_vars[slot]
+
+    def run_AREFG(self, slot, target):
+        self.registers[target] = self.global_vars[slot]
+
+    # Instrucciones vectoriales (ver vectorize.py)
+
+    def run_VADDI(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.add, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop], self.int_bits)
+
+    def run_VSUBI(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.sub, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop], self.int_bits)
+
+    def run_VMULI(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.mul, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop], self.int_bits)
+
+    def run_VADDF(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.add, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop])
+
+    def run_VSUBF(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.sub, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop])
+
+    def run_VMULF(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.mul, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop])
+
+    def run_VDIVF(self, target, left, right, start, stop):
+        registers = self.registers
+        elementwise(operator.truediv, registers[target], registers[left], registers[right],
+                    registers[start], registers[stop])
+
+    def run_VSUMI(self, initial, values, start, stop, target):
+        registers = self.registers
+        registers[target] = reduce_sum(registers[initial], registers[values], registers[start],
+                                       registers[stop], self.int_bits)
+
+    def run_VSUMF(self, initial, values, start, stop, target):
+        registers = self.registers
+        registers[target] = reduce_sum(registers[initial], registers[values], registers[start],
+                                       registers[stop], floating=True)
+
+    def run_CALL(self, name, *args):
+        *sources, target = args
+        self.registers[target] = self.call(name, [self.registers[source] for source in sources])
+
+    def run_RET(self, source):
+        self.return_value = self.registers[source]
+        self.pc = None
+
+    def run_RETV(self):
+        self.return_value = None
+        self.pc = None
+
+    # Aritmética entera de ancho fijo (int_bits)
+
+    def wrap(self, value):
+        return ((value + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_ADDI(self, left, right, target):
+        self.registers[target] = ((self.registers[left] + self.registers[right] + self.int_bias)
+                                  & self.int_mask) - self.int_bias
+
+    def wrap_SUBI(self, left, right, target):
+        self.registers[target] = ((self.registers[left] - self.registers[right] + self.int_bias)
+                                  & self.int_mask) - self.int_bias
+
+    def wrap_MULI(self, left, right, target):
+        self.registers[target] = ((self.registers[left] * self.registers[right] + self.int_bias)
+                                  & self.int_mask) - self.int_bias
+
+    def wrap_DIVI(self, left, right, target):
+        dividend = self.registers[left]
+        divisor = self.registers[right]
+        quotient = dividend // divisor
+        if quotient < 0 and quotient * divisor != dividend:
+            # C trunca hacia cero
+            quotient += 1
+        # Solo MIN / -1 se sale de rango
+        self.registers[target] = ((quotient + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_REMI(self, left, right, target):
+        dividend = self.registers[left]
+        divisor = self.registers[right]
+        remainder = dividend % divisor
+        if remainder and (remainder < 0) != (dividend < 0):
+            # En C el resto tiene el signo del dividendo
+            remainder -= divisor
+        self.registers[target] = remainder
+
+    def wrap_NEGI(self, source, target):
+        self.registers[target] = ((self.int_bias - self.registers[source]) & self.int_mask) - self.int_bias
+
+    def wrap_SHLI(self, source, value, target):
+        self.registers[target] = (((self.registers[source] << value) + self.int_bias)
+                                  & self.int_mask) - self.int_bias
+
+    def wrap_ADDKI(self, source, value, target):
+        self.registers[target] = ((self.registers[source] + value + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_MULKI(self, source, value, target):
+        self.registers[target] = ((self.registers[source] * value + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_DIVKI(self, source, value, target):
+        dividend = self.registers[source]
+        quotient = dividend // value
+        if quotient < 0 and quotient * value != dividend:
+            quotient += 1
+        self.registers[target] = ((quotient + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_REMKI(self, source, value, target):
+        dividend = self.registers[source]
+        remainder = dividend % value
+        if remainder and (remainder < 0) != (dividend < 0):
+            remainder -= value
+        self.registers[target] = remainder
+
+    def wrap_LOOPLI(self, slot, step, bound, op, body_label, exit_label):
+        value = ((self.local_vars[slot] + step + self.int_bias) & self.int_mask) - self.int_bias
+        self.local_vars[slot] = value
+        self.pc = body_label if op(value, self.registers[bound]) else exit_label
+
+    def wrap_LOOPGI(self, slot, step, bound, op, body_label, exit_label):
+        value = ((self.global_vars[slot] + step + self.int_bias) & self.int_mask) - self.int_bias
+        self.global_vars[slot] = value
+        self.pc = body_label if op(value, self.registers[bound]) else exit_label
+
+    def wrap_INCLI(self, slot, value):
+        self.local_vars[slot] = ((self.local_vars[slot] + value + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_INCGI(self, slot, value):
+        self.global_vars[slot] = ((self.global_vars[slot] + value + self.int_bias) & self.int_mask) - self.int_bias
+
+    def wrap_ADDLI(self, slot, source):
+        self.local_vars[slot] = ((self.local_vars[slot] + self.registers[source] + self.int_bias)
+                                 & self.int_mask) - self.int_bias
+
+    def wrap_ADDGI(self, slot, source):
+        self.global_vars[slot] = ((self.global_vars[slot] + self.registers[source] + self.int_bias)
+                                  & self.int_mask) - self.int_bias
+
+    # Los arreglos se guardan en array.array del ancho elegido
+
+    def wrap_AVARI(self, slot, size):
+        self.global_vars[slot] = array(INT_TYPECODES[self.int_bits], [0]) * self.registers[size]
+
+    def wrap_AVARF(self, slot, size):
+        self.global_vars[slot] = array('d', [0.0]) * self.registers[size]
+
+    wrap_AVARB = wrap_AVARI
+
+    def wrap_AALLOCI(self, slot, size):
+        self.local_vars[slot] = array(INT_TYPECODES[self.int_bits], [0]) * self.registers[size]
+
+    def wrap_AALLOCF(self, slot, size):
+        self.local_vars[slot] = array('d', [0.0]) * self.registers[size]
+
+    wrap_AALLOCB = wrap_AALLOCI
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    Intérprete que mide la ejecución del programa.  Su ciclo de ejecución
+    es una copia del de Interpreter.call con las mediciones agregadas, así
+    el intérprete normal no paga ningún costo cuando no se usa --profile.
+
+    Se cuenta cuántas veces se ejecuta cada instrucción de cada función;
+    de ahí salen los totales por código de operación, por función y por
+    etiqueta.  El tiempo de cada código de operación es acumulado (el de
+    CALL incluye el de la función llamada), y el tiempo propio de una
+    función excluye el de las funciones que llama.
+    """
+
+    def __init__(self, output=None, int_bits=None):
+        # Los ciclos compilados no se podrían medir
+        super().__init__(output, int_bits, jit_threshold=None)
+        # Código de operación y etiqueta de cada instrucción, por función
+        self.op_codes = {}
+        self.labels = {}
+
+        self.instruction_counts = {}
+        self.opcode_times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.self_times = defaultdict(float)
+
+        # Tiempo de las funciones llamadas, por cada marco activo
+        self.child_times = []
+
+    def resolve(self, program, function):
+        code = super().resolve(program, function)
+        op_codes = []
+        labels = []
+        for position, op_code, operands in decode(program, function):
+            op_codes.append(op_code)
+            labels.append(f"L{position}" if op_code == OpCode.LABEL else None)
+        op_codes.append(OpCode.RETV)
+        labels.append(None)
+
+        self.op_codes[function.name] = op_codes
+        self.labels[function.name] = labels
+        self.instruction_counts[function.name] = [0] * len(code)
+        return code
+
+    def call(self, name, args):
+        code = self.code[name]
+        op_codes = self.op_codes[name]
+        counts = self.instruction_counts[name]
+        opcode_times = self.opcode_times
+        clock = time.perf_counter
+
+        frame = (self.registers, self.local_vars, self.pc)
+        self.registers = [None] * self.register_counts[name]
+        self.local_vars = [None] * len(self.functions[name].locals)
+        self.local_vars[:len(args)] = args
+
+        self.calls[name] += 1
+        self.child_times.append(0.0)
+        start = clock()
+
+        self.pc = 0
+        while self.pc is not None:
+            pc = self.pc
+            method, args = code[pc]
+            self.pc += 1
+            before = clock()
+            method(*args)
+            opcode_times[op_codes[pc]] += clock() - before
+            counts[pc] += 1
+
+        elapsed = clock() - start
+        self.self_times[name] += elapsed - self.child_times.pop()
+        if self.child_times:
+            self.child_times[-1] += elapsed
+
+        self.registers, self.local_vars, self.pc = frame
+        return self.return_value
+
+    def profile(self):
+        """
+        Devuelve los datos medidos como un diccionario, con cada tabla
+        ordenada de mayor a menor
+        """
+        opcode_counts = defaultdict(int)
+        functions = []
+        labels = []
+        for name, counts in self.instruction_counts.items():
+            for pc, count in enumerate(counts):
+                opcode_counts[self.op_codes[name][pc]] += count
+                if self.labels[name][pc] and count:
+                    labels.append({'function': name, 'label': self.labels[name][pc], 'count': count})
+            if self.calls[name]:
+                functions.append({'function': name, 'calls': self.calls[name],
+                                  'instructions': sum(counts), 'self_time': self.self_times[name]})
+
+        opcodes = [{'opcode': op_code.name, 'count': count, 'time': self.opcode_times[op_code]}
+                   for op_code, count in opcode_counts.items() if count]
+        return {
+            'opcodes': sorted(opcodes, key=lambda row: row['time'], reverse=True),
+            'functions': sorted(functions, key=lambda row: row['self_time'], reverse=True),
+            'labels': sorted(labels, key=lambda row: row['count'], reverse=True),
+        }
+
+
+def format_profile(profile, limit=20):
+    """
+    Tablas legibles con las primeras filas de cada sección de profile()
+    """
+    lines = [f"{'opcode':<12}{'count':>12}{'time (s)':>12}{'per op (ns)':>14}"]
+    for row in profile['opcodes'][:limit]:
+        lines.append(f"{row['opcode']:<12}{row['count']:>12}{row['time']:>12.4f}"
+                     f"{row['time'] / row['count'] * 1e9:>14.0f}")
+
+    lines.append('')
+    lines.append(f"{'function':<20}{'calls':>10}{'instructions':>14}{'self (s)':>12}")
+    for row in profile['functions'][:limit]:
+        lines.append(f"{row['function']:<20}{row['calls']:>10}{row['instructions']:>14}"
+                     f"{row['self_time']:>12.4f}")
+
+    lines.append('')
+    lines.append(f"{'function':<20}{'label':<12}{'count':>12}")
+    for row in profile['labels'][:limit]:
+        lines.append(f"{row['function']:<20}{row['label']:<12}{row['count']:>12}")
+    return '\n'.join(lines)
 
 
 # ----------------------------------------------------------------------
@@ -139,20 +811,55 @@ class Interpreter(object):
 # ----------------------------------------------------------------------
 
 def main():
-    import sys
+    import argparse
     from ircode import compile_ircode
     from errors import errors_reported
 
-    if len(sys.argv) != 2:
-        sys.stderr.write('Usage: python3 -m minic.interp filename\n')
-        raise SystemExit(1)
-
-    source = open(sys.argv[1]).read()
-    code = compile_ircode(source)
-    if not errors_reported():
-        interpreter = Interpreter()
+    parser = argparse.ArgumentParser(prog='python3 -m minic.interp')
+    parser.add_argument('filename')
+    parser.add_argument('--profile', action='store_true',
+                        help='mostrar estadísticas de ejecución al terminar')
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help='guardar las estadísticas de ejecución en formato JSON')
+    parser.add_argument('--flush', choices=FLUSH_POLICIES, default='size',
+                        help='cuándo escribir la salida del programa (por defecto size)')
+    parser.add_argument('--buffer-size', type=int, default=8192,
+                        help='tamaño del buffer de salida para --flush=size')
+    parser.add_argument('--int-bits', type=int, choices=sorted(INT_TYPECODES),
+                        help='usar enteros de C de ese ancho (por defecto, enteros de Python)')
+    parser.add_argument('--jit-threshold', type=int, default=JIT_THRESHOLD,
+                        help=f'vueltas de un ciclo antes de compilarlo (por defecto {JIT_THRESHOLD})')
+    parser.add_argument('--no-jit', action='store_true', help='no compilar los ciclos calientes')
+    args = parser.parse_args()
+
+    profiling = args.profile or args.profile_json
+    output = OutputSink(sys.stdout, args.flush, args.buffer_size)
+    if profiling:
+        interpreter = ProfilingInterpreter(output, args.int_bits)
+    else:
+        interpreter = Interpreter(output, args.int_bits, None if args.no_jit else args.jit_threshold)
+
+    if args.filename.endswith('.mir'):
+        # Imagen ya compilada, se ejecuta sin pasar por el compilador
+        from mir import read_mir
+
+        interpreter.execute(read_mir(args.filename))
+    else:
+        source = open(args.filename).read()
+        code = compile_ircode(source, int_bits=args.int_bits)
+        if errors_reported():
+            return
         interpreter.execute(code)
 
+    if profiling:
+        profile = interpreter.profile()
+        if args.profile:
+            sys.stdout.flush()
+            sys.stderr.write(format_profile(profile) + '\n')
+        if args.profile_json:
+            with open(args.profile_json, 'w') as file:
+                json.dump(profile, file, indent=2)
+
 
 if __name__ == '__main__':
     main()
@@ -51,14 +51,21 @@ Esta es una especificación del conjunto de instrucciones para nuestro
 código de IR:
 
     MOVI   value, target       ;  Load a literal integer
-    VARI   name                ;  Declare an integer variable
-    ALLOCI name                ;  Allocate an integer variable on the stack
-    LOADI  name, target        ;  Load an integer from a variable
-    STOREI target, name        ;  Store an integer into a variable
+    VARI   slot                ;  Declare a global integer variable
+    ALLOCI slot                ;  Allocate a local integer variable on the stack
+    LOADLI slot, target        ;  Load an integer from a local variable
+    LOADGI slot, target        ;  Load an integer from a global variable
+    STORELI source, slot       ;  Store an integer into a local variable
+    STOREGI source, slot       ;  Store an integer into a global variable
     ADDI   r1, r2, target      ;  target = r1 + r2
     SUBI   r1, r2, target      ;  target = r1 - r2
     MULI   r1, r2, target      ;  target = r1 * r2
     DIVI   r1, r2, target      ;  target = r1 / r2
+    REMI   r1, r2, target      ;  target = r1 % r2
+    NEGI   r1, target          ;  target = -r1
+    SHLI   r1, value, target   ;  target = r1 << value
+    SHRI   r1, value, target   ;  target = r1 >> value
+    MASKI  r1, value, target   ;  target = r1 & value
     PRINTI source              ;  print source  (debugging)
     CMPI   op, r1, r2, target  ;  Compare r1 op r2 -> target
     AND    r1, r2, target      :  target = r1 & r2
@@ -67,28 +74,53 @@ código de IR:
     ITOF   r1, target          ;  target = float(r1)
 
     MOVF   value, target       ;  Load a literal float
-    VARF   name                ;  Declare a float variable
-    ALLOCF name                ;  Allocate a float variable on the stack
-    LOADF  name, target        ;  Load a float from a variable
-    STOREF target, name        ;  Store a float into a variable
+    VARF   slot                ;  Declare a global float variable
+    ALLOCF slot                ;  Allocate a local float variable on the stack
+    LOADLF slot, target        ;  Load a float from a local variable
+    LOADGF slot, target        ;  Load a float from a global variable
+    STORELF source, slot       ;  Store a float into a local variable
+    STOREGF source, slot       ;  Store a float into a global variable
     ADDF   r1, r2, target      ;  target = r1 + r2
     SUBF   r1, r2, target      ;  target = r1 - r2
     MULF   r1, r2, target      ;  target = r1 * r2
     DIVF   r1, r2, target      ;  target = r1 / r2
+    NEGF   r1, target          ;  target = -r1
     PRINTF source              ;  print source (debugging)
     CMPF   op, r1, r2, target  ;  r1 op r2 -> target
     FTOI   r1, target          ;  target = int(r1)
 
     MOVB   value, target       ; Load a literal byte
-    VARB   name                ; Declare a byte variable
-    ALLOCB name                ; Allocate a byte variable
-    LOADB  name, target        ; Load a byte from a variable
-    STOREB target, name        ; Store a byte into a variable
+    VARB   slot                ; Declare a global byte variable
+    ALLOCB slot                ; Allocate a local byte variable
+    LOADLB slot, target        ; Load a byte from a local variable
+    LOADGB slot, target        ; Load a byte from a global variable
+    STORELB source, slot       ; Store a byte into a local variable
+    STOREGB source, slot       ; Store a byte into a global variable
     PRINTB source              ; print source (debugging)
+    PRINTS value               ; print a string constant
     BTOI   r1, target          ; Convert a byte to an integer
     ITOB   r2, target          ; Truncate an integer to a byte
     CMPB   op, r1, r2, target  ; r1 op r2 -> target
 
+    COPY   r1, target          ; target = r1 (cualquier tipo)
+
+Las variables no se nombran en el código IR, sino por el número de
+slot que se les asigna durante la generación de código.  Los slots
+locales son propios de cada función (los parámetros ocupan los primeros)
+y los globales son comunes a todo el programa.  Los nombres de cada slot
+se guardan en el atributo locals del objeto Function correspondiente.
+
+Los arreglos usan instrucciones propias, donde index es un registro:
+
+    AVARI   slot, size             ; Declare a global integer array
+    AALLOCI slot, size             ; Allocate a local integer array
+    ALOADLI slot, index, target    ; Load an element of a local array
+    ALOADGI slot, index, target    ; Load an element of a global array
+    ASTORELI source, slot, index   ; Store into an element of a local array
+    ASTOREGI source, slot, index   ; Store into an element of a global array
+
+(y sus equivalentes F y B para los arreglos de float y char).
+
 Estas son algunas instrucciones de control de flujo
 
     LABEL  name                  ; Declare a label
@@ -96,6 +128,78 @@ Estas son algunas instrucciones de control de flujo
     CBRANCH test, label1, label2 ; Conditional branch to label1 or label2 depending on test being 0 or not
     CALL   name, arg0, arg1, ... argN, target    ; Call a function name(arg0, ... argn) -> target
     RET    r1                    ; Return a result from a function
+    RETV                         ; Return from a void function
+
+Las condiciones de if, while y for no producen un registro booleano: cada
+comparación salta directamente a la rama que corresponde, y && y || se
+evalúan en cortocircuito como una cadena de saltos.
+
+    BLTI   r1, r2, label1, label2  ; Branch to label1 if r1 < r2, else to label2
+    BLEI   r1, r2, label1, label2  ; r1 <= r2
+    BGTI   r1, r2, label1, label2  ; r1 > r2
+    BGEI   r1, r2, label1, label2  ; r1 >= r2
+    BEQI   r1, r2, label1, label2  ; r1 == r2
+    BNEI   r1, r2, label1, label2  ; r1 != r2
+
+(y sus equivalentes F y B).
+
+Los ciclos for con un contador entero usan una instrucción especial al
+final de cada iteración, que reemplaza la actualización del contador,
+la comparación y el salto condicional:
+
+    LOOPLI slot, step, bound, op, label1, label2
+        ; slot += step, luego salta a label1 si slot op bound, o a label2
+    LOOPGI slot, step, bound, op, label1, label2
+        ; igual, para un contador global
+
+La pasada de superinstrucciones (ver superinst.py) reemplaza algunas
+secuencias frecuentes por una sola instrucción:
+
+    INCLI  slot, value                 ; slot += value (variable local)
+    ADDLI  slot, r1                    ; slot += r1
+    CMPBRLI op, slot, r1, label1, label2
+        ; salta a label1 si slot op r1, o a label2
+
+(INCG, ADDG y CMPBRG son sus equivalentes para variables globales, y
+existen las variantes F de todas y B de CMPBR).
+
+Operandos inmediatos
+====================
+Cuando un operando es una constante, la pasada de immediates.py lo
+escribe directamente en la instrucción en lugar de cargarlo en un
+registro con MOV.  Cada instrucción con un operando inmediato tiene su
+propio código de operación, con una K antes del tipo, así el intérprete
+no necesita revisar qué clase de operando recibe:
+
+    ADDKI  r1, value, target           ; target = r1 + value
+    MULKI  r1, value, target           ; target = r1 * value
+    DIVKI  r1, value, target           ; target = r1 / value
+    REMKI  r1, value, target           ; target = r1 % value
+    CMPKI  op, r1, value, target       ; target = r1 op value
+    CMPBRKI op, r1, value, label1, label2
+        ; salta a label1 si r1 op value, o a label2
+    STORELKI value, slot               ; guarda value en una variable local
+    STOREGKI value, slot               ; guarda value en una variable global
+
+(y sus variantes F, y B para CMP, CMPBR y STORE).  La resta de una
+constante se escribe como la suma de su opuesto.  En el texto del código
+los registros se escriben R1, R2, ... y los inmediatos con su valor.
+
+Instrucciones vectoriales
+=========================
+Los ciclos que recorren arreglos elemento por elemento (ver
+vectorize.py) se ejecutan con una sola instrucción.  Sus arreglos se
+cargan antes en un registro, y cada operando de VADD, VSUB, VMUL y VDIV
+puede ser un arreglo o un valor escalar:
+
+    AREFL  slot, target                ; target = el arreglo local slot
+    AREFG  slot, target                ; target = el arreglo global slot
+    VADDI  a, r1, r2, start, stop      ; a[n] = r1[n] + r2[n], start <= n < stop
+    VSUBI  a, r1, r2, start, stop      ; a[n] = r1[n] - r2[n]
+    VMULI  a, r1, r2, start, stop      ; a[n] = r1[n] * r2[n]
+    VSUMI  r1, a, start, stop, target  ; target = r1 + a[start] + ... + a[stop - 1]
+
+(y sus variantes F, más VDIVF).
 
 Single Static Assignment
 ========================
@@ -118,8 +222,11 @@ SSA representado como tuplas de la forma
        (operation, operands, ..., destination)
 """
 
+from array import array
 from collections import ChainMap
+from enum import IntEnum
 from checker import print_node
+from vectorize import match_vector_loop
 import cast
 
 IR_TYPE_MAPPING = {
@@ -127,9 +234,41 @@ IR_TYPE_MAPPING = {
     'float': 'F',
     'char': 'B',
     'bool': 'I',
+    'string': 'S',
     'void': 'V'
 }
 
+# Secuencias de escape de los literales char y string
+ESCAPES = {
+    'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v',
+    '0': '\0', '\\': '\\', "'": "'", '"': '"', '?': '?',
+}
+
+
+def decode_literal(text):
+    """
+    Devuelve el valor de un literal char o string tal como lo entrega el
+    lexer: sin las comillas y con las secuencias de escape reemplazadas
+    """
+    body = text[1:-1]
+    chars = []
+    n = 0
+    while n < len(body):
+        if body[n] != '\\':
+            chars.append(body[n])
+            n += 1
+        elif body[n + 1] == 'x':
+            chars.append(chr(int(body[n + 2:n + 4], 16)))
+            n += 4
+        elif body[n + 1] in '0123' and len(body[n + 2:n + 4]) == 2 and all(c in '01234567' for c in body[n + 2:n + 4]):
+            chars.append(chr(int(body[n + 1:n + 4], 8)))
+            n += 4
+        else:
+            chars.append(ESCAPES.get(body[n + 1], body[n + 1]))
+            n += 2
+    return ''.join(chars)
+
+
 OP_CODES = ChainMap({
     'mov': 'MOV',
     '+': 'ADD',
@@ -137,27 +276,183 @@ OP_CODES = ChainMap({
     '*': 'MUL',
     '/': 'DIV',
     '%': 'REM',
+    'neg': 'NEG',
     '&&': 'AND',
     '||': 'OR',
+    'xor': 'XOR',
     'print': 'PRINT',
     'var': 'VAR',
     'alloc': 'ALLOC',  # Local allocation (inside functions)
-    'load': 'LOAD',
-    'store': 'STORE',
+    'avar': 'AVAR',
+    'aalloc': 'AALLOC',
+    'load_local': 'LOADL',
+    'load_global': 'LOADG',
+    'store_local': 'STOREL',
+    'store_global': 'STOREG',
+    'aload_local': 'ALOADL',
+    'aload_global': 'ALOADG',
+    'astore_local': 'ASTOREL',
+    'astore_global': 'ASTOREG',
     'label': 'LABEL',
     'cbranch': 'CBRANCH',  # Conditional branch
     'branch': 'BRANCH',  # Unconditional branch
     'call': 'CALL',
-    'ret': 'RET'},
+    'ret': 'RET',
+    'loop_local': 'LOOPL',
+    'loop_global': 'LOOPG',
+    'branch<': 'BLT',
+    'branch<=': 'BLE',
+    'branch>': 'BGT',
+    'branch>=': 'BGE',
+    'branch==': 'BEQ',
+    'branch!=': 'BNE',
+    'aref_local': 'AREFL',
+    'aref_global': 'AREFG',
+    'vector+': 'VADD',
+    'vector-': 'VSUB',
+    'vector*': 'VMUL',
+    'vector/': 'VDIV',
+    'vector_sum': 'VSUM'},
     dict.fromkeys(['<', '>', '<=', '>=', '==', '!='], "CMP")
 )
 
+COMPARE_OPS = ('<', '<=', '>', '>=', '==', '!=')
+
+# Formato de los operandos de cada instrucción. Cada letra indica el tipo
+# de un operando:
+#
+#    r   registro que se lee          w   registro que se escribe
+#    s   slot de una variable         l   etiqueta
+#    v   valor literal                o   operador de comparación
+#    f   nombre de una función        *   cero o más registros que se leen
+#
+# Las instrucciones de TYPED_FORMATS existen en las variantes de tipo
+# indicadas (I, F y B).
+TYPED_FORMATS = {
+    'MOV': ('vw', 'IFB'),
+    'VAR': ('s', 'IFB'),
+    'ALLOC': ('s', 'IFB'),
+    'AVAR': ('sr', 'IFB'),
+    'AALLOC': ('sr', 'IFB'),
+    'LOADL': ('sw', 'IFB'),
+    'LOADG': ('sw', 'IFB'),
+    'STOREL': ('rs', 'IFB'),
+    'STOREG': ('rs', 'IFB'),
+    'ALOADL': ('srw', 'IFB'),
+    'ALOADG': ('srw', 'IFB'),
+    'ASTOREL': ('rsr', 'IFB'),
+    'ASTOREG': ('rsr', 'IFB'),
+    'ADD': ('rrw', 'IF'),
+    'SUB': ('rrw', 'IF'),
+    'MUL': ('rrw', 'IF'),
+    'DIV': ('rrw', 'IF'),
+    'REM': ('rrw', 'I'),
+    'NEG': ('rw', 'IF'),
+    'SHL': ('rvw', 'I'),
+    'SHR': ('rvw', 'I'),
+    'MASK': ('rvw', 'I'),
+    'CMP': ('orrw', 'IFB'),
+    'PRINT': ('r', 'IFB'),
+    'LOOPL': ('svroll', 'I'),
+    'LOOPG': ('svroll', 'I'),
+    'BLT': ('rrll', 'IFB'),
+    'BLE': ('rrll', 'IFB'),
+    'BGT': ('rrll', 'IFB'),
+    'BGE': ('rrll', 'IFB'),
+    'BEQ': ('rrll', 'IFB'),
+    'BNE': ('rrll', 'IFB'),
+    'INCL': ('sv', 'IF'),
+    'INCG': ('sv', 'IF'),
+    'ADDL': ('sr', 'IF'),
+    'ADDG': ('sr', 'IF'),
+    'CMPBRL': ('osrll', 'IFB'),
+    'CMPBRG': ('osrll', 'IFB'),
+    'ADDK': ('rvw', 'IF'),
+    'MULK': ('rvw', 'IF'),
+    'DIVK': ('rvw', 'IF'),
+    'REMK': ('rvw', 'I'),
+    'CMPK': ('orvw', 'IFB'),
+    'CMPBRK': ('orvll', 'IFB'),
+    'STORELK': ('vs', 'IFB'),
+    'STOREGK': ('vs', 'IFB'),
+    'VADD': ('rrrrr', 'IF'),
+    'VSUB': ('rrrrr', 'IF'),
+    'VMUL': ('rrrrr', 'IF'),
+    'VDIV': ('rrrrr', 'F'),
+    'VSUM': ('rrrrw', 'IF'),
+}
+
+UNTYPED_FORMATS = {
+    'AND': 'rrw',
+    'OR': 'rrw',
+    'XOR': 'rrw',
+    'COPY': 'rw',
+    'PRINTS': 'v',
+    'LABEL': 'l',
+    'BRANCH': 'l',
+    'CBRANCH': 'rll',
+    'AREFL': 'sw',
+    'AREFG': 'sw',
+    'CALL': 'f*w',
+    'RET': 'r',
+    'RETV': '',
+}
+
+INSTRUCTION_FORMATS = dict(UNTYPED_FORMATS)
+for _name, (_format, _suffixes) in TYPED_FORMATS.items():
+    for _suffix in _suffixes:
+        INSTRUCTION_FORMATS[_name + _suffix] = _format
+
+
+class _OpCode(IntEnum):
+    """
+    Código de operación de una instrucción IR. El nombre solo se usa al
+    imprimir las instrucciones.
+    """
+
+    def __repr__(self):
+        return self.name
+
+    __str__ = __repr__
+
+
+OpCode = _OpCode('OpCode', list(INSTRUCTION_FORMATS), start=0)
+
+# Formato de operandos indexado por el número del código de operación
+OPERAND_FORMATS = tuple(INSTRUCTION_FORMATS[op.name] for op in OpCode)
+
+# Tabla (operación, tipo) -> código, construida una sola vez
+_OP_CODE_TABLE = {}
+for _operation, _name in OP_CODES.items():
+    for _type_name, _suffix in [(None, '')] + list(IR_TYPE_MAPPING.items()):
+        if _name + _suffix in OpCode.__members__:
+            _OP_CODE_TABLE[_operation, _type_name] = OpCode[_name + _suffix]
+
 
 def get_op_code(operation, type_name=None):
-    op_code = OP_CODES[operation]
-    suffix = "" if not type_name else IR_TYPE_MAPPING[type_name]
+    return _OP_CODE_TABLE[operation, type_name]
 
-    return f"{op_code}{suffix}"
+
+def operand_kinds(instruction):
+    """
+    Devuelve el tipo (según OPERAND_FORMATS) de cada operando de una
+    instrucción, expandiendo la lista variable de registros '*'
+    """
+    op_code, *operands = instruction
+    kinds = OPERAND_FORMATS[op_code]
+    if '*' in kinds:
+        star = kinds.index('*')
+        count = len(operands) - len(kinds) + 1
+        kinds = kinds[:star] + 'r' * count + kinds[star + 1:]
+    return kinds
+
+
+def format_instruction(instruction):
+    """
+    Representación legible de una instrucción
+    """
+    op_code, *operands = instruction
+    return f"{op_code.name:<9}{', '.join(map(str, operands))}"
 
 
 class Function:
@@ -170,6 +465,11 @@ class Function:
         self.parameters = parameters
         self.return_type = return_type
 
+        # Nombres de las variables indexados por su slot. Los parámetros
+        # ocupan los primeros slots. En __minic_init los slots son los de
+        # las variables globales del programa.
+        self.locals = []
+
         self.code = []
 
     def append(self, ir_instruction):
@@ -183,16 +483,211 @@ class Function:
         return f"{self.name}({params}) -> {self.return_type}"
 
 
+class PackedFunction:
+    """
+    Una función con sus instrucciones codificadas en un arreglo de enteros.
+    Cada instrucción ocupa el código de operación seguido de sus operandos
+    según OPERAND_FORMATS:
+
+        r, w    número del registro ('R12' -> 12)
+        s       número del slot
+        l       posición de la instrucción LABEL dentro del arreglo
+        v, o    índice en el pool de constantes del programa
+        f       índice de la función en el programa
+        *       cantidad de registros, seguida de cada registro
+    """
+
+    def __init__(self, func_name, parameters, return_type, local_names, code):
+        self.name = func_name
+        self.parameters = parameters
+        self.return_type = return_type
+        self.locals = local_names
+        self.code = code
+
+    def __repr__(self):
+        params = [f"{pname}:{ptype}" for pname, ptype in self.parameters]
+        return f"{self.name}({params}) -> {self.return_type}"
+
+
+class PackedProgram:
+    """
+    Programa en la codificación compacta: las funciones empaquetadas y el
+    pool de constantes que comparten
+    """
+
+    def __init__(self, functions, constants):
+        self.functions = functions
+        self.constants = constants
+
+
+def pack(functions):
+    """
+    Codifica una lista de objetos Function como un PackedProgram
+    """
+    func_index = {func.name: n for n, func in enumerate(functions)}
+    constants = []
+    const_index = {}
+    packed = []
+
+    for func in functions:
+        code = array('i')
+        labels = {}
+        label_refs = []
+        for instruction in func.code:
+            op_code = instruction[0]
+            if op_code == OpCode.LABEL:
+                labels[instruction[1]] = len(code)
+            code.append(op_code)
+
+            kinds = OPERAND_FORMATS[op_code]
+            operands = instruction[1:]
+            if '*' in kinds:
+                # La lista variable de registros va precedida de su tamaño
+                star = kinds.index('*')
+                count = len(operands) - len(kinds) + 1
+                operands = (*operands[:star], count, *operands[star:])
+                kinds = kinds[:star] + 's' + 'r' * count + kinds[star + 1:]
+
+            for kind, operand in zip(kinds, operands):
+                if kind in 'rw':
+                    code.append(int(operand[1:]))
+                elif kind == 's':
+                    code.append(operand)
+                elif kind == 'l':
+                    label_refs.append((len(code), operand))
+                    code.append(-1)
+                elif kind == 'f':
+                    code.append(func_index[operand])
+                else:
+                    # 1, 1.0 y True son iguales como llaves de un dict
+                    key = (type(operand), operand)
+                    if key not in const_index:
+                        const_index[key] = len(constants)
+                        constants.append(operand)
+                    code.append(const_index[key])
+
+        for position, label in label_refs:
+            code[position] = labels[label]
+
+        packed.append(PackedFunction(func.name, func.parameters, func.return_type,
+                                     func.locals, code))
+
+    return PackedProgram(packed, constants)
+
+
+def decode(program, func):
+    """
+    Recorre las instrucciones de una función empaquetada. Produce tuplas
+    (posición, código, operandos) donde las constantes y los nombres de
+    función ya están resueltos; los registros, slots y etiquetas quedan
+    como enteros.
+    """
+    code = func.code
+    constants = program.constants
+    pos = 0
+    while pos < len(code):
+        start = pos
+        op_code = OpCode(code[pos])
+        pos += 1
+        operands = []
+        for kind in OPERAND_FORMATS[op_code]:
+            if kind == '*':
+                count = code[pos]
+                operands.extend(code[pos + 1:pos + 1 + count])
+                pos += count + 1
+                continue
+
+            value = code[pos]
+            pos += 1
+            if kind in 'vo':
+                value = constants[value]
+            elif kind == 'f':
+                value = program.functions[value].name
+            operands.append(value)
+        yield start, op_code, operands
+
+
+def unpack(program):
+    """
+    Reconstruye la lista de objetos Function de un PackedProgram
+    """
+    functions = []
+    for packed in program.functions:
+        func = Function(packed.name, packed.parameters, packed.return_type)
+        func.locals = packed.locals
+        for _, op_code, operands in decode(program, packed):
+            kinds = operand_kinds((op_code, *operands))
+            func.append((op_code, *[f"R{operand}" if kind in 'rw' else
+                                    f"L{operand}" if kind == 'l' else operand
+                                    for kind, operand in zip(kinds, operands)]))
+        functions.append(func)
+    return functions
+
+
+class AssignedNames(cast.NodeVisitor):
+    """
+    Recoge los nombres de las variables escalares que se modifican en un
+    fragmento del AST, y si en él se llama alguna función
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.calls = False
+
+    def visit_VarAssignmentExpr(self, node):
+        self.names.add(node.name)
+        self.visit(node.value)
+
+    def visit_UnaryOpExpr(self, node):
+        if node.op in ('++', '--') and isinstance(node.expr, cast.VarExpr):
+            self.names.add(node.expr.name)
+        self.visit(node.expr)
+
+    def visit_FuncCallExpr(self, node):
+        self.calls = True
+        self.visit(node.arguments)
+
+
+# Operador equivalente al intercambiar los operandos de una comparación
+SWAPPED_COMPARE_OPS = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+# Sentencias que se visitan aunque no se puedan ejecutar (ver GenerateCode.visit)
+DECLARATIONS = (cast.CompoundStmt, cast.LocalVarDeclStmt, cast.LocalArrayDeclStmt)
+
+
+def loop_step(expr, name):
+    """
+    Devuelve el incremento constante que aplica expr a la variable name
+    (i++, i--, i += c, i -= c o i = i + c), o None
+    """
+    if isinstance(expr, cast.UnaryOpExpr) and expr.op in ('++', '--'):
+        if isinstance(expr.expr, cast.VarExpr) and expr.expr.name == name:
+            return 1 if expr.op == '++' else -1
+    elif isinstance(expr, cast.VarAssignmentExpr) and expr.name == name:
+        if expr.op in ('+=', '-=') and isinstance(expr.value, cast.IntegerLiteral):
+            return expr.value.value if expr.op == '+=' else -expr.value.value
+        value = expr.value
+        if (expr.op == '=' and isinstance(value, cast.BinaryOpExpr) and value.op in ('+', '-') and
+                isinstance(value.left, cast.VarExpr) and value.left.name == name and
+                isinstance(value.right, cast.IntegerLiteral)):
+            return value.right.value if value.op == '+' else -value.right.value
+    return None
+
+
 class GenerateCode(cast.NodeVisitor):
     """
     Clase visitante de nodo que crea secuencias de instrucciones
     codificadas de 3 direcciones.
     """
 
-    def __init__(self):
+    def __init__(self, vectorize=True):
         # Contador de registros
         self.register_count = 0
 
+        # Generar instrucciones vectoriales para los ciclos que lo
+        # permitan (ver vectorize.py)
+        self.vectorize = vectorize
+
         # Contador rótulos de bloque
         self.label_count = 0
 
@@ -201,12 +696,28 @@ class GenerateCode(cast.NodeVisitor):
 
         self.functions = [init_function]
 
-        # El código generado (lista de tuplas)
+        # La función actual y su código generado (lista de tuplas)
+        self.function = init_function
         self.code = init_function.code
 
+        # Slots asignados a las variables globales y a las locales
+        # de la función actual
+        self.global_slots = {}
+        self.local_slots = {}
+
         # Lista de loop merge labels para BreakStmt
         self.loop_merge_labels = []
 
+        # Textos de los literales string, para que los iguales compartan
+        # el mismo objeto
+        self.strings = {}
+
+        # Indica si el código que se está generando se puede ejecutar: se
+        # vuelve falso después de un salto o un return, y verdadero en la
+        # siguiente etiqueta a la que salte alguna instrucción
+        self.reachable = True
+        self.jump_targets = set()
+
         # Esta bandera indica si el código actual que se está visitando
         # está en alcance global, o no
         self.global_scope = True
@@ -222,6 +733,65 @@ class GenerateCode(cast.NodeVisitor):
         self.label_count += 1
         return f"L{self.label_count}"
 
+    def visit(self, node):
+        # Las sentencias que no se pueden ejecutar no generan código.  Los
+        # bloques y las declaraciones se visitan igual, para asignar los
+        # slots de sus variables.
+        if not self.reachable and isinstance(node, cast.Statement) and not isinstance(node, DECLARATIONS):
+            return
+        super().visit(node)
+
+    def emit_label(self, label):
+        self.code.append((get_op_code('label'), label))
+        self.reachable = self.reachable or label in self.jump_targets
+
+    def emit_jump(self, instruction):
+        """
+        Agrega una instrucción de salto.  Ningún salto continúa con la
+        instrucción siguiente, así que lo que sigue no se puede ejecutar
+        hasta la próxima etiqueta a la que se salte.
+        """
+        if self.reachable:
+            self.code.append(instruction)
+            self.jump_targets.update(operand for kind, operand in zip(operand_kinds(instruction), instruction[1:])
+                                     if kind == 'l')
+        self.reachable = False
+
+    def new_slot(self, name):
+        """
+        Asigna un slot a una nueva variable en el alcance actual
+        """
+        slots = self.global_slots if self.global_scope else self.local_slots
+        slot = slots[name] = len(self.function.locals)
+        self.function.locals.append(name)
+        return slot
+
+    def lookup_slot(self, name):
+        """
+        Devuelve el alcance ('local' o 'global') y el slot de una variable
+        """
+        if name in self.local_slots:
+            return 'local', self.local_slots[name]
+        return 'global', self.global_slots[name]
+
+    def emit_load(self, name, type_name, target, index=None):
+        scope, slot = self.lookup_slot(name)
+        if index is None:
+            op_code = get_op_code(f'load_{scope}', type_name)
+            self.code.append((op_code, slot, target))
+        else:
+            op_code = get_op_code(f'aload_{scope}', type_name)
+            self.code.append((op_code, slot, index, target))
+
+    def emit_store(self, source, name, type_name, index=None):
+        scope, slot = self.lookup_slot(name)
+        if index is None:
+            op_code = get_op_code(f'store_{scope}', type_name)
+            self.code.append((op_code, source, slot))
+        else:
+            op_code = get_op_code(f'astore_{scope}', type_name)
+            self.code.append((op_code, source, slot, index))
+
     # Debe implementar los métodos visit_Nodename para todos los demás
     # Nodos AST.  En tu código, necesitarás hacer instrucciones
     # y adjuntarlas a la lista de self-code.
@@ -229,84 +799,258 @@ class GenerateCode(cast.NodeVisitor):
     # Algunos métodos de muestra siguen. Puede que tenga que ajustar
     # dependiendo de los nombres y la estructura de sus nodos AST.
 
-    def visit_IfStmt(self, node):
-        self.visit(node.condition)
+    def emit_condition(self, node, true_label, false_label):
+        """
+        Genera el código de una condición que salta a true_label o a
+        false_label, sin producir un registro con su valor.  Los operadores
+        && y || se evalúan en cortocircuito.
+        """
+        if isinstance(node, cast.BinaryOpExpr) and node.op in ('&&', '||'):
+            # El operando derecho solo se evalúa si hace falta
+            right_label = self.new_label()
+            if node.op == '&&':
+                self.emit_condition(node.left, right_label, false_label)
+            else:
+                self.emit_condition(node.left, true_label, right_label)
+            self.emit_label(right_label)
+            self.emit_condition(node.right, true_label, false_label)
+
+        elif isinstance(node, cast.UnaryOpExpr) and node.op == '!':
+            self.emit_condition(node.expr, false_label, true_label)
 
+        elif isinstance(node, cast.BinaryOpExpr) and node.op in COMPARE_OPS:
+            # Comparar y saltar en una sola instrucción
+            self.visit(node.left)
+            self.visit(node.right)
+            op_code = get_op_code('branch' + node.op, node.left.type.name)
+            self.emit_jump((op_code, node.left.register, node.right.register, true_label, false_label))
+
+        elif isinstance(node, cast.BoolLiteral):
+            self.emit_jump((get_op_code('branch'), true_label if node.value == 'true' else false_label))
+
+        else:
+            self.visit(node)
+            self.emit_jump((get_op_code('cbranch'), node.register, true_label, false_label))
+
+    def visit_IfStmt(self, node):
         # Genera etiquetas para ambas ramas
         t_label = self.new_label()
         f_label = self.new_label()
         merge_label = self.new_label()
-        lbl_op_code = get_op_code('label')
         branch_op_code = get_op_code('branch')
 
-        # Inserta la instrucción CBRANCH
-        cbranch_op_code = get_op_code('cbranch')
-        self.code.append((cbranch_op_code, node.condition.register, t_label, f_label))
+        # Salta directamente a una de las ramas
+        self.emit_condition(node.condition, t_label, f_label)
 
         # Ahora, el código para el bloque true
-        self.code.append((lbl_op_code, t_label))
+        self.emit_label(t_label)
         self.visit(node.true_block)
         # Y debemos mezclar la etiqueta
-        self.code.append((branch_op_code, merge_label))
+        self.emit_jump((branch_op_code, merge_label))
 
         # Genera etiqueta para bloque false
-        self.code.append((lbl_op_code, f_label))
+        self.emit_label(f_label)
         self.visit(node.false_block)
-        self.code.append((branch_op_code, merge_label))
+        self.emit_jump((branch_op_code, merge_label))
 
         # Ahora insertamos la etiqueta mezclada
-        self.code.append((lbl_op_code, merge_label))
+        self.emit_label(merge_label)
 
     def visit_WhileStmt(self, node):
         top_label = self.new_label()  # Para antes de la evaluación de condición
         start_label = self.new_label()  # Para después de la condición
         merge_label = self.new_label()  # Para salir del ciclo
-        lbl_op_code = get_op_code('label')
         branch_op_code = get_op_code('branch')
 
         # Guardar el merge label en la lista
         self.loop_merge_labels.append(merge_label)
 
         # Esto es necesario ya que LLVM requiere de un branch a label
-        self.code.append((branch_op_code, top_label))
-
-        self.code.append((lbl_op_code, top_label))
-        self.visit(node.condition)  # Generar instrucción de CMP
+        self.emit_jump((branch_op_code, top_label))
 
-        # Inserta la instrucción CBRANCH
-        cbranch_op_code = get_op_code('cbranch')
-        self.code.append((cbranch_op_code, node.condition.register, start_label, merge_label))
+        self.emit_label(top_label)
+        self.emit_condition(node.condition, start_label, merge_label)
 
         # Ahora, el código para el cuerpo del ciclo
-        self.code.append((lbl_op_code, start_label))
+        self.emit_label(start_label)
         self.visit(node.body)
 
         # Luego de visitar el body, remover el merge label
         self.loop_merge_labels.pop()
 
         # Regresa a la etiqueta inicial
-        self.code.append((branch_op_code, top_label))
+        self.emit_jump((branch_op_code, top_label))
 
         # Ahora insertamos la etiqueta mezclada
-        self.code.append((lbl_op_code, merge_label))
+        self.emit_label(merge_label)
+
+    def counted_loop(self, node):
+        """
+        Reconoce un for con un contador entero, de la forma
+
+            for (...; i op bound; i += step) body
+
+        donde step es una constante, y ni i ni bound se modifican en el
+        cuerpo. Devuelve (i, step, op, bound), o None.
+        """
+        if len(node.condition) != 1 or len(node.loop) != 1:
+            return None
+
+        cond = node.condition[0]
+        if not isinstance(cond, cast.BinaryOpExpr) or cond.op not in COMPARE_OPS:
+            return None
+
+        if isinstance(cond.left, cast.VarExpr):
+            var, op, bound = cond.left, cond.op, cond.right
+        elif isinstance(cond.right, cast.VarExpr):
+            var, op, bound = cond.right, SWAPPED_COMPARE_OPS[cond.op], cond.left
+        else:
+            return None
+
+        if var.type.name != 'int' or not isinstance(bound, (cast.IntegerLiteral, cast.VarExpr)):
+            return None
+
+        step = loop_step(node.loop[0], var.name)
+        if not step:
+            return None
+
+        assigned = AssignedNames()
+        assigned.visit(node.body)
+        if var.name in assigned.names:
+            return None
+
+        if isinstance(bound, cast.VarExpr):
+            # Una función puede modificar una variable global
+            bound_scope, _ = self.lookup_slot(bound.name)
+            if (bound.name == var.name or bound.name in assigned.names or
+                    (assigned.calls and bound_scope == 'global')):
+                return None
+
+        return var.name, step, op, bound
+
+    def emit_array_ref(self, name):
+        scope, slot = self.lookup_slot(name)
+        register = self.new_register()
+        self.code.append((get_op_code(f'aref_{scope}'), slot, register))
+        return register
+
+    def emit_vector_loop(self, name, op, bound, loop, body_label, merge_label):
+        """
+        Genera un ciclo reconocido por vectorize.py: si name op bound, una
+        sola instrucción vectorial recorre los elementos desde name hasta
+        bound, y name queda con el valor final del contador
+        """
+        self.visit(bound)
+        stop = bound.register
+        if op == '<=':
+            one = self.new_register()
+            self.code.append((get_op_code('mov', 'int'), 1, one))
+            stop = self.new_register()
+            self.code.append((get_op_code('+', 'int'), bound.register, one, stop))
+
+        start = self.new_register()
+        self.emit_load(name, 'int', start)
+        self.emit_jump((get_op_code('branch<', 'int'), start, stop, body_label, merge_label))
+        self.emit_label(body_label)
+
+        operands = []
+        for operand in loop.operands:
+            if isinstance(operand, str):
+                operands.append(self.emit_array_ref(operand))
+            else:
+                self.visit(operand)
+                operands.append(operand.register)
+
+        if loop.kind == 'sum':
+            initial = self.new_register()
+            total = self.new_register()
+            self.emit_load(loop.target, loop.type_name, initial)
+            self.code.append((get_op_code('vector_sum', loop.type_name), initial, *operands, start, stop, total))
+            self.emit_store(total, loop.target, loop.type_name)
+        else:
+            target = self.emit_array_ref(loop.target)
+            self.code.append((get_op_code('vector' + loop.op, loop.type_name), target, *operands, start, stop))
+
+        self.emit_store(stop, name, 'int')
+        self.emit_label(merge_label)
+
+    def visit_ForStmt(self, node):
+        body_label = self.new_label()  # Para el cuerpo del ciclo
+        merge_label = self.new_label()  # Para salir del ciclo
+        branch_op_code = get_op_code('branch')
+
+        self.visit(node.init)
+
+        counted = self.counted_loop(node)
+        if counted and self.vectorize:
+            name, step, op, bound = counted
+            vector = match_vector_loop(node.body, name) if step == 1 and op in ('<', '<=') else None
+            if vector:
+                self.emit_vector_loop(name, op, bound, vector, body_label, merge_label)
+                return
+
+        if counted:
+            name, step, op, bound = counted
+
+            # El límite se evalúa una sola vez, antes de la primera prueba
+            self.visit(bound)
+            register = self.new_register()
+            self.emit_load(name, 'int', register)
+            self.emit_jump((get_op_code('branch' + op, 'int'), register, bound.register,
+                            body_label, merge_label))
+        else:
+            top_label = self.new_label()  # Para antes de la evaluación de condición
+            self.emit_jump((branch_op_code, top_label))
+            self.emit_label(top_label)
+            if node.condition:
+                # Solo el valor de la última expresión decide el salto
+                self.visit(node.condition[:-1])
+                self.emit_condition(node.condition[-1], body_label, merge_label)
+
+        # Ahora, el código para el cuerpo del ciclo
+        self.loop_merge_labels.append(merge_label)
+        self.emit_label(body_label)
+        self.visit(node.body)
+        self.loop_merge_labels.pop()
+
+        if counted:
+            # Incrementar, comparar y saltar en una sola instrucción
+            scope, slot = self.lookup_slot(name)
+            op_code = get_op_code(f'loop_{scope}', 'int')
+            self.emit_jump((op_code, slot, step, bound.register, op, body_label, merge_label))
+        else:
+            if self.reachable:
+                self.visit(node.loop)
+            self.emit_jump((branch_op_code, top_label))
+
+        # Ahora insertamos la etiqueta mezclada
+        self.emit_label(merge_label)
 
     def visit_ReturnStmt(self, node):
-        self.visit(node.value)
-        op_code = get_op_code('ret')
-        self.code.append((op_code, node.value.register))
-        node.register = node.value.register
+        if node.value:
+            self.visit(node.value)
+            op_code = get_op_code('ret')
+            self.code.append((op_code, node.value.register))
+            node.register = node.value.register
+        else:
+            self.code.append((get_op_code('ret', 'void'),))
+        self.reachable = False
 
     def visit_BreakStmt(self, node):
         branch_op_code = get_op_code('branch')
         label = self.loop_merge_labels[-1]
         inst = (branch_op_code, label)
-        self.code.append(inst)
+        self.emit_jump(inst)
 
     def visit_PrintStmt(self, node):
         self.visit(node.arguments)
         for arg in node.arguments:
             op_code = get_op_code('print', arg.type.name)
-            inst = (op_code, arg.register)
+            if isinstance(arg, cast.StringLiteral):
+                # El texto completo se imprime con una sola instrucción
+                inst = (op_code, arg.constant)
+            else:
+                inst = (op_code, arg.register)
             self.code.append(inst)
         # registers = [arg.register for arg in node.arguments]
         # self.code.append((op_code, node.name, *registers, target))
@@ -324,59 +1068,68 @@ class GenerateCode(cast.NodeVisitor):
             func.name = "__minic_main"
 
         # Y cambiar la función actual a la nueva.
-        old_code = self.code
+        old_function = self.function
+        self.function = func
         self.code = func.code
 
         # Ahora, genera el nuevo código de función.
         self.global_scope = False  # Turn off global scope
+        self.reachable = True
+        for param in node.params:
+            self.new_slot(param.name)
         self.visit(node.body)
         self.global_scope = True  # Turn back on global scope
+        self.reachable = True
+        self.local_slots = {}
 
         # Y, finalmente, volver a la función original en la que estábamos
-        self.code = old_code
+        self.function = old_function
+        self.code = old_function.code
 
     def visit_StaticVarDeclStmt(self, node):
         self.visit(node.datatype)
 
         # La declaración de variable depende del alcance
         op_code = get_op_code('var', node.type.name)
-        def_inst = (op_code, node.name)
+        def_inst = (op_code, self.new_slot(node.name))
         self.code.append(def_inst)
 
         if node.value:
             self.visit(node.value)
-            op_code = get_op_code('store', node.type.name)
-            inst = (op_code, node.value.register, node.name)
-            self.code.append(inst)
+            self.emit_store(node.value.register, node.name, node.type.name)
 
     def visit_StaticArrayDeclStmt(self, node):
         self.visit(node.datatype)
         self.visit(node.size)
 
-        op_code = get_op_code('var', node.type.name)
-        inst = (op_code, node.name + '[' + node.size.register + ']')
+        op_code = get_op_code('avar', node.type.name)
+        inst = (op_code, self.new_slot(node.name), node.size.register)
         self.code.append(inst)
 
     def visit_LocalVarDeclStmt(self, node):
         self.visit(node.datatype)
+        if not self.reachable:
+            self.new_slot(node.name)
+            return
 
         # La declaración de variable depende del alcance
         op_code = get_op_code('alloc', node.type.name)
-        def_inst = (op_code, node.name)
+        def_inst = (op_code, self.new_slot(node.name))
         self.code.append(def_inst)
 
         if node.value:
             self.visit(node.value)
-            op_code = get_op_code('store', node.type.name)
-            inst = (op_code, node.value.register, node.name)
-            self.code.append(inst)
+            self.emit_store(node.value.register, node.name, node.type.name)
 
     def visit_LocalArrayDeclStmt(self, node):
         self.visit(node.datatype)
+        if not self.reachable:
+            self.new_slot(node.name)
+            return
         self.visit(node.size)
 
-        op_code = get_op_code('alloc', node.type.name)
-        inst = (op_code, node.name + '[' + node.size.register + ']')
+        op_code = get_op_code('aalloc', node.type.name)
+        inst = (op_code, self.new_slot(node.name), node.size.register)
         self.code.append(inst)
 
     def visit_IntegerLiteral(self, node):
@@ -396,7 +1149,7 @@ class GenerateCode(cast.NodeVisitor):
         target = self.new_register()
         op_code = get_op_code('mov', 'char')
         # Se obtiene el valor ASCII del char
-        self.code.append((op_code, ord(node.value), target))
+        self.code.append((op_code, ord(decode_literal(node.value)), target))
         node.register = target
 
     def visit_BoolLiteral(self, node):
@@ -406,28 +1159,32 @@ class GenerateCode(cast.NodeVisitor):
         self.code.append((op_code, value, target))
         node.register = target
 
+    def visit_StringLiteral(self, node):
+        # Al empaquetar el programa cada texto distinto ocupa una sola
+        # entrada del pool de constantes (ver pack)
+        text = decode_literal(node.value)
+        node.constant = self.strings.setdefault(text, text)
+
     def visit_FuncCallExpr(self, node):
         self.visit(node.arguments)
         target = self.new_register()
         op_code = get_op_code('call')
         registers = [arg.register for arg in node.arguments]
-        self.code.append((op_code, node.name, *registers, target))
+        # La función main se renombra al declararla
+        name = "__minic_main" if node.name == "main" else node.name
+        self.code.append((op_code, name, *registers, target))
         node.register = target
 
     def visit_VarExpr(self, node):
-        op_code = get_op_code('load', node.type.name)
         register = self.new_register()
-        inst = (op_code, node.name, register)
-        self.code.append(inst)
+        self.emit_load(node.name, node.type.name, register)
         node.register = register
 
     def visit_ArrayExpr(self, node):
         self.visit(node.index)
 
-        op_code = get_op_code('load', node.type.name)
         register = self.new_register()
-        inst = (op_code, node.name + '[' + node.index.register + ']', register)
-        self.code.append(inst)
+        self.emit_load(node.name, node.type.name, register, node.index.register)
         node.register = register
 
     def visit_UnaryOpExpr(self, node):
@@ -438,44 +1195,43 @@ class GenerateCode(cast.NodeVisitor):
         if operator == '+':
             # El operador unario + no produce código extra
             node.register = node.expr.register
+        elif operator == '-':
+            # -x no se escribe como 0 - x: con float, 0.0 - 0.0 es 0.0 y
+            # -0.0 es -0.0
+            target = self.new_register()
+            self.code.append((get_op_code('neg', node_type), node.expr.register, target))
+            node.register = target
         else:
             # Para tener en cuenta el hecho de que el código de máquina no
-            # admite operaciones unarias, primero debemos cargar un 0 o 1,
-            # dependiendo de la operación, en un nuevo registro.
+            # admite operaciones unarias, primero debemos cargar un 1 en un
+            # nuevo registro.
             mov_op_code = get_op_code('mov', node_type)
             aux_target = self.new_register()
-            aux_value = 0 if operator == '-' else 1  # 0 para el menos unario
-            aux_inst = (mov_op_code, aux_value, aux_target)
-            self.code.append(aux_inst)
+            self.code.append((mov_op_code, 1, aux_target))
 
             # XOR es para el operador boolean NOT
-            op_code = 'XOR' if operator == '!' else get_op_code(operator[0], node_type)
+            op_code = get_op_code('xor') if operator == '!' else get_op_code(operator[0], node_type)
 
             target = self.new_register()
-            if aux_value:
-                inst = (op_code, node.expr.register, aux_target, target)
-            else:
-                inst = (op_code, aux_target, node.expr.register, target)
-
-            self.code.append(inst)
+            self.code.append((op_code, node.expr.register, aux_target, target))
             node.register = target
 
             if operator in ('++', '--'):
                 # Si la operación es inc o dec, se debe
                 # guardar el nuevo valor de la variable
-                store_op_code = get_op_code('store', node_type)
-                store_inst = (store_op_code, target, node.expr.name)
-                self.code.append(store_inst)
+                self.emit_store(target, node.expr.name, node_type)
 
     def visit_BinaryOpExpr(self, node):
         self.visit(node.left)
         self.visit(node.right)
         operator = node.op
 
-        op_code = get_op_code(operator, node.left.type.name)
+        # AND y OR no dependen del tipo de los operandos
+        type_name = None if operator in ('&&', '||') else node.left.type.name
+        op_code = get_op_code(operator, type_name)
 
         target = self.new_register()
-        if op_code.startswith('CMP'):
+        if operator in COMPARE_OPS:
             inst = (op_code, operator, node.left.register, node.right.register, target)
         else:
             inst = (op_code, node.left.register, node.right.register, target)
@@ -491,10 +1247,8 @@ class GenerateCode(cast.NodeVisitor):
 
         if operator != '=':
             # Cargar el valor de la propia variable
-            load_op_code = get_op_code('load', node_type)
             load_register = self.new_register()
-            load_inst = (load_op_code, node.name, load_register)
-            self.code.append(load_inst)
+            self.emit_load(node.name, node_type, load_register)
 
             # Hacer la operación binaria
             target = self.new_register()
@@ -503,9 +1257,7 @@ class GenerateCode(cast.NodeVisitor):
             self.code.append(inst)
             node.register = target
 
-        store_op_code = get_op_code('store', node_type)
-        store_inst = (store_op_code, node.register, node.name)
-        self.code.append(store_inst)
+        self.emit_store(node.register, node.name, node_type)
 
     def visit_ArrayAssignmentExpr(self, node):
         self.visit(node.value)
@@ -517,10 +1269,8 @@ class GenerateCode(cast.NodeVisitor):
 
         if operator != '=':
             # Cargar el valor de la propia variable
-            load_op_code = get_op_code('load', node_type)
             load_register = self.new_register()
-            load_inst = (load_op_code, node.name + '[' + index_register + ']', load_register)
-            self.code.append(load_inst)
+            self.emit_load(node.name, node_type, load_register, index_register)
 
             # Hacer la operación binaria
             target = self.new_register()
@@ -529,9 +1279,7 @@ class GenerateCode(cast.NodeVisitor):
             self.code.append(inst)
             node.register = target
 
-        store_op_code = get_op_code('store', node_type)
-        store_inst = (store_op_code, node.register, node.name + '[' + index_register + ']')
-        self.code.append(store_inst)
+        self.emit_store(node.register, node.name, node_type, index_register)
 
 
 # ----------------------------------------------------------------------
@@ -541,40 +1289,129 @@ class GenerateCode(cast.NodeVisitor):
 # ----------------------------------------------------------------------
 
 
-def compile_ircode(source):
+def compile_ircode(source, inline_report=None, phases=None, trace_memory=True, superinstructions=True,
+                   vectorize=True, int_bits=None):
     """
-    Genera código intermedio desde el fuente.
+    Genera código intermedio desde el fuente.  Si se da la lista
+    inline_report, se le agrega el resultado de cada llamada examinada
+    por la expansión en línea (ver inline.py).  Si se da la lista phases,
+    se le agregan las mediciones de cada fase (ver phases.py); con
+    trace_memory=False solo se miden los tiempos.  Con
+    superinstructions=False no se aplica superinst.py, y con
+    vectorize=False no se generan instrucciones vectoriales.  int_bits es
+    el ancho de los enteros con que se va a ejecutar el código (ver
+    interp.Interpreter); las simplificaciones que suponen enteros sin
+    límite no se aplican si se da.
     """
-    from cparse import parse
+    from clex import Lexer
+    from cparse import Parser
     from checker import check_program
+    from cleanup import clean_control_flow
+    from deadcode import eliminate_dead_code
     from errors import errors_reported
-
-    ast = parse(source)
-    check_program(ast)
-
-    # Si no ocurrió error, genere código
-    if not errors_reported():
-        gen = GenerateCode()
-        gen.visit(ast)
-        return gen.functions
-    else:
-        return []
+    from inline import inline_functions
+    from loopopt import hoist_loop_invariants
+    from peephole import simplify
+    from phases import PhaseTimer
+    from regalloc import allocate_registers
+    from immediates import use_immediates
+    from superinst import fuse
+    from tailcall import eliminate_tail_calls
+
+    def ir_size(functions):
+        return sum(len(func.code) for func in functions)
+
+    def run_pass(name, function_pass):
+        with timer.phase(name) as stats:
+            for func in gen.functions:
+                function_pass(func)
+            stats.instructions = ir_size(gen.functions)
+
+    with PhaseTimer(phases, trace_memory) as timer:
+        with timer.phase('lex') as stats:
+            tokens = list(Lexer().tokenize(source))
+            stats.tokens = len(tokens)
+
+        with timer.phase('parse') as stats:
+            ast = Parser().parse(iter(tokens))
+            stats.ast_nodes = len(cast.flatten(ast)) if ast else 0
+
+        with timer.phase('check'):
+            check_program(ast)
+
+        # Si ocurrió error, no se genera código
+        if errors_reported():
+            return []
+
+        with timer.phase('deadcode') as stats:
+            eliminate_dead_code(ast)
+            stats.ast_nodes = len(cast.flatten(ast))
+
+        with timer.phase('codegen') as stats:
+            gen = GenerateCode(vectorize)
+            gen.visit(ast)
+            stats.instructions = ir_size(gen.functions)
+
+        run_pass('tailcall', lambda func: eliminate_tail_calls(func, gen))
+
+        with timer.phase('inline') as stats:
+            report = inline_functions(gen.functions, gen)
+            stats.instructions = ir_size(gen.functions)
+        if inline_report is not None:
+            inline_report.extend(report)
+
+        run_pass('simplify', lambda func: simplify(func, int_bits))
+        run_pass('licm', hoist_loop_invariants)
+        if superinstructions:
+            run_pass('fuse', fuse)
+        run_pass('immediates', use_immediates)
+        run_pass('cleanup', clean_control_flow)
+        run_pass('regalloc', allocate_registers)
+
+    return gen.functions
 
 
 def main():
+    import argparse
     import sys
 
-    if len(sys.argv) != 2:
-        sys.stderr.write("Usage: python3 -m minic.ircode filename\n")
-        raise SystemExit(1)
-
-    source = open(sys.argv[1]).read()
-    code = compile_ircode(source)
+    parser = argparse.ArgumentParser(prog='python3 -m minic.ircode')
+    parser.add_argument('filename')
+    parser.add_argument('-o', dest='output', metavar='output.mir',
+                        help='guardar el código en formato MIR')
+    parser.add_argument('--inline-report', action='store_true',
+                        help='mostrar las llamadas expandidas en línea')
+    parser.add_argument('--time-phases', action='store_true',
+                        help='mostrar el tiempo y la memoria de cada fase')
+    parser.add_argument('--int-bits', type=int, choices=(32, 64),
+                        help='generar código para enteros de C de ese ancho')
+    args = parser.parse_args()
+
+    source = open(args.filename).read()
+    report = []
+    phases = [] if args.time_phases else None
+    code = compile_ircode(source, report, phases, int_bits=args.int_bits)
+
+    if args.inline_report:
+        for site in report:
+            sys.stderr.write(f"{site}\n")
+    if args.time_phases:
+        from phases import format_phases
+
+        sys.stderr.write(format_phases(phases) + '\n')
+
+    if args.output:
+        from errors import errors_reported
+        from mir import write_mir
+
+        if not errors_reported():
+            write_mir(code, args.output)
+        return
 
     for f in code:
         print(f'{"::" * 5} {f} {"::" * 5}')
         for instruction in f.code:
-            print(instruction)
+            print(format_instruction(instruction))
         print("*" * 30)
 
 
@@ -0,0 +1,308 @@
+# jit.py
+"""
+Compilación de ciclos calientes
+===============================
+
+El intérprete (ver interp.py) paga en cada instrucción una llamada a su
+método y la lectura de sus operandos en la lista de registros.  Los
+ciclos que se ejecutan muchas veces se traducen a una función de Python
+que hace el mismo trabajo sin ese costo:
+
+*   Al resolver el código, cada salto hacia atrás a una etiqueta (el fin
+    de un ciclo) se envuelve en un contador.  Cuando un ciclo vuelve a su
+    cabecera más de threshold veces, se compila.
+
+*   El ciclo son las instrucciones desde la etiqueta de cabecera hasta su
+    último salto hacia atrás.  Cada bloque se traduce a sentencias de
+    Python, los registros son variables locales (r0, r1, ...) y los saltos
+    eligen el siguiente bloque; un salto fuera del ciclo termina la
+    función, que devuelve la posición donde sigue el intérprete:
+
+        LABEL    L1                  b = 12
+        LOADLI   0, R1               while True:
+        ADDI     R1, R2, R3              if b == 12:
+        STORELI  R3, 0       ==>             r1 = L[0]
+        CMPBRLI  <, 0, R4, L1, L2            r3 = r1 + r2
+                                             L[0] = r3
+                                             if L[0] < r4:
+                                                 b = 12
+                                                 continue
+                                             pc = 17
+                                             break
+
+*   La función se guarda en el ciclo y se reutiliza en las siguientes
+    entradas.  Como los tipos de MiniC son estáticos, cada registro tiene
+    siempre el mismo tipo y la función no necesita comprobarlos.  Los
+    ciclos con instrucciones que no se saben traducir (las declaraciones
+    de arreglos) no se compilan.
+
+Con int_bits se traducen las operaciones enteras con el truncado de los
+métodos wrap_opcode del intérprete.
+"""
+
+import operator
+
+from ircode import OpCode, operand_kinds
+from cfg import TERMINATORS, label_targets
+from vectorize import elementwise, reduce_sum
+
+# Saltos hacia atrás antes de compilar un ciclo
+JIT_THRESHOLD = 50
+
+OPERATOR_SYMBOLS = {
+    operator.lt: '<',
+    operator.le: '<=',
+    operator.gt: '>',
+    operator.ge: '>=',
+    operator.eq: '==',
+    operator.ne: '!=',
+}
+
+BRANCH_SYMBOLS = {'BLT': '<', 'BLE': '<=', 'BGT': '>', 'BGE': '>=', 'BEQ': '==', 'BNE': '!='}
+
+# Sentencias de Python de cada instrucción.  {n} es su operando n: los
+# registros como r0, r1, ..., los valores con repr() y los operadores de
+# comparación con su símbolo.
+TEMPLATES = {
+    'MOV': '{1} = {0}',
+    'ADD': '{2} = {0} + {1}',
+    'SUB': '{2} = {0} - {1}',
+    'MUL': '{2} = {0} * {1}',
+    'DIVI': '{2} = {0} // {1}',
+    'DIVF': '{2} = {0} / {1}',
+    'REMI': '{2} = {0} % {1}',
+    'NEG': '{1} = -{0}',
+    'SHLI': '{2} = {0} << {1}',
+    'SHRI': '{2} = {0} >> {1}',
+    'MASKI': '{2} = {0} & {1}',
+    'COPY': '{1} = {0}',
+    'AND': '{2} = {0} & {1}',
+    'OR': '{2} = {0} | {1}',
+    'XOR': '{2} = {0} ^ {1}',
+    'CMP': '{3} = int({1} {0} {2})',
+    'PRINTI': "write(f'{{{0}}}\\n')",
+    'PRINTF': "write(f'{{{0}}}\\n')",
+    'PRINTB': 'write(chr({0}))',
+    'PRINTS': 'write({0})',
+    'ALLOCI': 'L[{0}] = 0',
+    'ALLOCF': 'L[{0}] = 0.0',
+    'ALLOCB': 'L[{0}] = 0',
+    'LOADL': '{1} = L[{0}]',
+    'LOADG': '{1} = G[{0}]',
+    'STOREL': 'L[{1}] = {0}',
+    'STOREG': 'G[{1}] = {0}',
+    'ALOADL': '{2} = L[{0}][{1}]',
+    'ALOADG': '{2} = G[{0}][{1}]',
+    'ASTOREL': 'L[{1}][{2}] = {0}',
+    'ASTOREG': 'G[{1}][{2}] = {0}',
+    'INCL': 'L[{0}] += {1}',
+    'INCG': 'G[{0}] += {1}',
+    'ADDL': 'L[{0}] += {1}',
+    'ADDG': 'G[{0}] += {1}',
+    'ADDK': '{2} = {0} + {1}',
+    'MULK': '{2} = {0} * {1}',
+    'DIVKI': '{2} = {0} // {1}',
+    'DIVKF': '{2} = {0} / {1}',
+    'REMKI': '{2} = {0} % {1}',
+    'CMPK': '{3} = int({1} {0} {2})',
+    'STORELK': 'L[{1}] = {0}',
+    'STOREGK': 'G[{1}] = {0}',
+    'AREFL': '{1} = L[{0}]',
+    'AREFG': '{1} = G[{0}]',
+    'VADDI': 'elementwise(add, {0}, {1}, {2}, {3}, {4}, int_bits)',
+    'VSUBI': 'elementwise(sub, {0}, {1}, {2}, {3}, {4}, int_bits)',
+    'VMULI': 'elementwise(mul, {0}, {1}, {2}, {3}, {4}, int_bits)',
+    'VADDF': 'elementwise(add, {0}, {1}, {2}, {3}, {4})',
+    'VSUBF': 'elementwise(sub, {0}, {1}, {2}, {3}, {4})',
+    'VMULF': 'elementwise(mul, {0}, {1}, {2}, {3}, {4})',
+    'VDIVF': 'elementwise(truediv, {0}, {1}, {2}, {3}, {4})',
+    'VSUMI': '{4} = reduce_sum({0}, {1}, {2}, {3}, int_bits)',
+    'VSUMF': '{4} = reduce_sum({0}, {1}, {2}, {3}, floating=True)',
+}
+
+# Variantes con truncado a int_bits (ver Interpreter.wrap_opcode);
+# BIAS y MASK se reemplazan por sus valores
+WRAPPING_TEMPLATES = {
+    'ADDI': '{2} = (({0} + {1} + BIAS) & MASK) - BIAS',
+    'SUBI': '{2} = (({0} - {1} + BIAS) & MASK) - BIAS',
+    'MULI': '{2} = (({0} * {1} + BIAS) & MASK) - BIAS',
+    'DIVI': '{2} = ((c_div({0}, {1}) + BIAS) & MASK) - BIAS',
+    'REMI': '{2} = c_rem({0}, {1})',
+    'NEGI': '{1} = ((BIAS - {0}) & MASK) - BIAS',
+    'SHLI': '{2} = ((({0} << {1}) + BIAS) & MASK) - BIAS',
+    'ADDKI': '{2} = (({0} + {1} + BIAS) & MASK) - BIAS',
+    'MULKI': '{2} = (({0} * {1} + BIAS) & MASK) - BIAS',
+    'DIVKI': '{2} = ((c_div({0}, {1}) + BIAS) & MASK) - BIAS',
+    'REMKI': '{2} = c_rem({0}, {1})',
+    'INCLI': 'L[{0}] = ((L[{0}] + {1} + BIAS) & MASK) - BIAS',
+    'INCGI': 'G[{0}] = ((G[{0}] + {1} + BIAS) & MASK) - BIAS',
+    'ADDLI': 'L[{0}] = ((L[{0}] + {1} + BIAS) & MASK) - BIAS',
+    'ADDGI': 'G[{0}] = ((G[{0}] + {1} + BIAS) & MASK) - BIAS',
+}
+
+
+def c_div(dividend, divisor):
+    # División entera de C, que trunca hacia cero
+    quotient = dividend // divisor
+    if quotient < 0 and quotient * divisor != dividend:
+        quotient += 1
+    return quotient
+
+
+def c_rem(dividend, divisor):
+    # Resto de C, con el signo del dividendo
+    remainder = dividend % divisor
+    if remainder and (remainder < 0) != (dividend < 0):
+        remainder -= divisor
+    return remainder
+
+
+class HotLoop:
+    """
+    Un ciclo de una función: la posición de su etiqueta de cabecera y la
+    de su último salto hacia atrás, con su contador y su código compilado
+    """
+
+    def __init__(self, function, header, end):
+        self.function = function
+        self.header = header
+        self.end = end
+        self.count = 0
+        self.compiled = None
+        self.disabled = False
+
+
+def find_loops(function, instructions):
+    """
+    Devuelve un diccionario {posición de un salto hacia atrás: HotLoop}
+    con los ciclos de una función ya resuelta
+    """
+    back_edges = {}
+    for pc, (op_code, operands) in enumerate(instructions):
+        if op_code in TERMINATORS:
+            for target in label_targets((op_code, *operands)):
+                if target <= pc:
+                    back_edges.setdefault(target, []).append(pc)
+
+    loops = {}
+    for header, jumps in back_edges.items():
+        loop = HotLoop(function, header, max(jumps))
+        for pc in jumps:
+            loops[pc] = loop
+    return loops
+
+
+def template(name, templates):
+    """
+    Busca la plantilla de una instrucción por su nombre completo o sin
+    el sufijo de tipo
+    """
+    return templates.get(name) or templates.get(name[:-1])
+
+
+def render(kind, operand):
+    if kind in 'rw':
+        return f'r{operand}'
+    if kind == 'o':
+        return OPERATOR_SYMBOLS[operand]
+    if kind in 'vf':
+        return repr(operand)
+    return str(operand)
+
+
+def compile_loop(loop, instructions, int_bits=None):
+    """
+    Traduce un ciclo a una función de Python f(interpreter, registers,
+    local_vars, global_vars) que devuelve la posición donde sigue la
+    ejecución, o None si la función terminó con un return.  Devuelve None
+    si el ciclo tiene instrucciones que no se traducen.
+    """
+    templates = dict(TEMPLATES)
+    if int_bits is not None:
+        bias = 1 << (int_bits - 1)
+        templates.update({name: text.replace('BIAS', str(bias)).replace('MASK', str((1 << int_bits) - 1))
+                          for name, text in WRAPPING_TEMPLATES.items()})
+
+    def goto(target, indent):
+        if loop.header <= target <= loop.end:
+            return [f'{indent}b = {target}', f'{indent}continue']
+        return [f'{indent}pc = {target}', f'{indent}break']
+
+    reads = set()
+    writes = set()
+    body = []
+    indent = ' ' * 12
+    for pc in range(loop.header, loop.end + 1):
+        op_code, operands = instructions[pc]
+        name = OpCode(op_code).name
+        kinds = operand_kinds((op_code, *operands))
+        for kind, operand in zip(kinds, operands):
+            if kind == 'r':
+                reads.add(operand)
+            elif kind == 'w':
+                writes.add(operand)
+        args = [render(kind, operand) for kind, operand in zip(kinds, operands)]
+
+        if op_code == OpCode.LABEL:
+            if pc != loop.header:
+                # El bloque anterior continúa en este
+                if body and not body[-1].endswith(('continue', 'break')):
+                    body.extend(goto(pc, indent))
+            body.append(f'        {"if" if pc == loop.header else "elif"} b == {pc}:')
+            continue
+
+        if op_code == OpCode.BRANCH:
+            body.extend(goto(operands[0], indent))
+            continue
+        if op_code in (OpCode.RET, OpCode.RETV):
+            value = args[0] if op_code == OpCode.RET else 'None'
+            body.extend([f'{indent}self.return_value = {value}', f'{indent}pc = None', f'{indent}break'])
+            continue
+
+        if op_code == OpCode.CBRANCH:
+            condition, targets = args[0], operands[1:]
+        elif name[:3] in BRANCH_SYMBOLS:
+            condition, targets = f'{args[0]} {BRANCH_SYMBOLS[name[:3]]} {args[1]}', operands[2:]
+        elif name.startswith('CMPBRK'):
+            condition, targets = f'{args[1]} {args[0]} {args[2]}', operands[3:]
+        elif name.startswith('CMPBR'):
+            scope = name[5]
+            condition, targets = f'{scope}[{args[1]}] {args[0]} {args[2]}', operands[3:]
+        elif op_code in (OpCode.LOOPLI, OpCode.LOOPGI):
+            scope = name[4]
+            slot, step, bound, op = args[:4]
+            update = template('INCLI' if scope == 'L' else 'INCGI', templates)
+            body.append(indent + update.format(slot, step))
+            condition, targets = f'{scope}[{slot}] {op} {bound}', operands[4:]
+        elif op_code == OpCode.CALL:
+            *sources, target = args[1:]
+            body.append(f"{indent}{target} = self.call({args[0]}, [{', '.join(sources)}])")
+            continue
+        else:
+            text = template(name, templates)
+            if text is None:
+                return None
+            body.append(indent + text.format(*args))
+            continue
+
+        body.append(f'{indent}if {condition}:')
+        body.extend(goto(targets[0], indent + '    '))
+        body.extend(goto(targets[1], indent))
+
+    used = sorted(reads | writes)
+    lines = ['def loop(self, R, L, G):']
+    lines.extend(f'    r{reg} = R[{reg}]' for reg in used)
+    lines.append('    write = self.output.write')
+    lines.append(f'    b = {loop.header}')
+    lines.append('    while True:')
+    lines.extend(body)
+    lines.extend(f'    R[{reg}] = r{reg}' for reg in sorted(writes))
+    lines.append('    return pc')
+
+    namespace = {
+        'int_bits': int_bits, 'c_div': c_div, 'c_rem': c_rem,
+        'elementwise': elementwise, 'reduce_sum': reduce_sum,
+        'add': operator.add, 'sub': operator.sub, 'mul': operator.mul, 'truediv': operator.truediv,
+    }
+    exec('\n'.join(lines), namespace)
+    return namespace['loop']
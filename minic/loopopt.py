@@ -0,0 +1,201 @@
+# loopopt.py
+"""
+Optimización de ciclos
+======================
+
+Movimiento de código invariante (loop-invariant code motion).  El código
+generado para un while vuelve a evaluar todo su cuerpo en cada iteración,
+incluyendo las cargas de variables que el ciclo nunca modifica y las
+constantes.  Esta pasada detecta los ciclos naturales del código IR
+(ver cfg.py) y mueve las instrucciones invariantes a un bloque nuevo
+(preheader) que se ejecuta una sola vez antes de entrar al ciclo:
+
+    antes                            después
+
+    LABEL  L1                        LABEL  L1.pre
+    LOADLI 0, R1                     LOADGI 1, R2
+    LOADGI 1, R2                     MOVI   3, R3
+    CMPI   <, R1, R2, R4     ==>     MULI   R2, R3, R5
+    CBRANCH R4, L2, L3               LABEL  L1
+    LABEL  L2                        LOADLI 0, R1
+    MOVI   3, R3                     CMPI   <, R1, R2, R4
+    MULI   R2, R3, R5                CBRANCH R4, L2, L3
+    ...                              LABEL  L2
+                                     ...
+
+Una instrucción es invariante si:
+
+1.  Es un MOV, una carga de una variable escalar, o una operación
+    aritmética, lógica o de comparación que no puede fallar (se excluyen
+    DIV y REM, que fallan al dividir por cero).
+
+2.  Sus registros de entrada se definen fuera del ciclo o por otras
+    instrucciones invariantes.
+
+3.  Para las cargas, el ciclo no guarda nada en esa variable.  Las
+    variables globales además requieren que el ciclo no llame funciones.
+
+Como el código todavía está en forma SSA, cada registro se define una sola
+vez y mover su definición antes del ciclo no cambia el valor que ven sus
+usos.  Por eso esta pasada debe ejecutarse antes de asignar registros.
+"""
+
+from collections import Counter
+from cfg import build_blocks, natural_loops, uses_defs, label_targets
+from ircode import OpCode
+
+# Instrucciones sin efectos secundarios que no pueden fallar
+PURE_OPS = {
+    OpCode.MOVI, OpCode.MOVF, OpCode.MOVB,
+    OpCode.ADDI, OpCode.ADDF, OpCode.SUBI, OpCode.SUBF,
+    OpCode.MULI, OpCode.MULF,
+    OpCode.CMPI, OpCode.CMPF, OpCode.CMPB,
+    OpCode.AND, OpCode.OR, OpCode.XOR,
+    OpCode.SHLI, OpCode.SHRI, OpCode.MASKI, OpCode.NEGI, OpCode.NEGF,
+    OpCode.COPY, OpCode.ADDKI, OpCode.ADDKF, OpCode.MULKI, OpCode.MULKF,
+    OpCode.CMPKI, OpCode.CMPKF, OpCode.CMPKB,
+}
+
+LOCAL_LOADS = {OpCode.LOADLI, OpCode.LOADLF, OpCode.LOADLB}
+GLOBAL_LOADS = {OpCode.LOADGI, OpCode.LOADGF, OpCode.LOADGB}
+
+# Instrucciones que modifican una variable local o global escalar
+STORES = {OpCode.STORELI, OpCode.STORELF, OpCode.STORELB,
+          OpCode.STOREGI, OpCode.STOREGF, OpCode.STOREGB,
+          OpCode.STORELKI, OpCode.STORELKF, OpCode.STORELKB,
+          OpCode.STOREGKI, OpCode.STOREGKF, OpCode.STOREGKB}
+LOCAL_WRITES = {OpCode.STORELI, OpCode.STORELF, OpCode.STORELB,
+                OpCode.STORELKI, OpCode.STORELKF, OpCode.STORELKB,
+                OpCode.ALLOCI, OpCode.ALLOCF, OpCode.ALLOCB, OpCode.LOOPLI,
+                OpCode.INCLI, OpCode.INCLF, OpCode.ADDLI, OpCode.ADDLF}
+GLOBAL_WRITES = {OpCode.STOREGI, OpCode.STOREGF, OpCode.STOREGB,
+                 OpCode.STOREGKI, OpCode.STOREGKF, OpCode.STOREGKB,
+                 OpCode.VARI, OpCode.VARF, OpCode.VARB, OpCode.LOOPGI,
+                 OpCode.INCGI, OpCode.INCGF, OpCode.ADDGI, OpCode.ADDGF}
+
+
+def _written_slot(instruction):
+    # STORE guarda en su segundo operando, las demás en el primero
+    return instruction[2] if instruction[0] in STORES else instruction[1]
+
+
+def find_invariants(code, blocks, loop, def_counts):
+    """
+    Devuelve las posiciones de las instrucciones invariantes del ciclo, en
+    el orden en que deben ejecutarse
+    """
+    positions = [pc for index in sorted(loop.body)
+                 for pc in range(blocks[index].start, blocks[index].end)]
+
+    local_stores = set()
+    global_stores = set()
+    has_calls = False
+    defined_in_loop = set()
+    for pc in positions:
+        instruction = code[pc]
+        if instruction[0] in LOCAL_WRITES:
+            local_stores.add(_written_slot(instruction))
+        elif instruction[0] in GLOBAL_WRITES:
+            global_stores.add(_written_slot(instruction))
+        elif instruction[0] == OpCode.CALL:
+            has_calls = True
+        defined_in_loop.update(uses_defs(instruction)[1])
+
+    invariant = []
+    hoisted = set()
+    invariant_regs = set()
+    changed = True
+    while changed:
+        changed = False
+        for pc in positions:
+            if pc in hoisted:
+                continue
+
+            instruction = code[pc]
+            op_code = instruction[0]
+            if op_code in LOCAL_LOADS:
+                movable = instruction[1] not in local_stores
+            elif op_code in GLOBAL_LOADS:
+                movable = instruction[1] not in global_stores and not has_calls
+            else:
+                movable = op_code in PURE_OPS
+
+            uses, defs = uses_defs(instruction)
+            if (movable and all(def_counts[reg] == 1 for reg in defs) and
+                    all(reg not in defined_in_loop or reg in invariant_regs for reg in uses)):
+                invariant.append(pc)
+                hoisted.add(pc)
+                invariant_regs.update(defs)
+                changed = True
+
+    return invariant
+
+
+def hoist_loop(code, blocks, loop, def_counts):
+    """
+    Mueve las instrucciones invariantes de un ciclo a su preheader.
+    Devuelve el código nuevo y la cantidad de instrucciones movidas, o
+    None si no hubo cambios.
+    """
+    header = blocks[loop.header]
+    if code[header.start][0] != OpCode.LABEL:
+        return None
+
+    # Si el bloque anterior es parte del ciclo y continúa en la cabecera,
+    # el preheader quedaría dentro del ciclo
+    previous = header.index - 1
+    if previous in loop.body and header.index in blocks[previous].successors:
+        return None
+
+    invariant = find_invariants(code, blocks, loop, def_counts)
+    if not invariant:
+        return None
+
+    header_label = code[header.start][1]
+    preheader_label = f"{header_label}.pre"
+    body_positions = {pc for index in loop.body
+                      for pc in range(blocks[index].start, blocks[index].end)}
+
+    new_code = []
+    hoisted = set(invariant)
+    for pc, instruction in enumerate(code):
+        if pc == header.start:
+            new_code.append((OpCode.LABEL, preheader_label))
+            new_code.extend(code[n] for n in invariant)
+        if pc in hoisted:
+            continue
+
+        # Los saltos desde fuera del ciclo deben pasar por el preheader
+        if pc not in body_positions and header_label in label_targets(instruction):
+            instruction = tuple(preheader_label if operand == header_label and n > 0 else operand
+                                for n, operand in enumerate(instruction))
+        new_code.append(instruction)
+
+    return new_code, len(invariant)
+
+
+def hoist_loop_invariants(func):
+    """
+    Aplica el movimiento de código invariante a todos los ciclos de una
+    función.  Devuelve la cantidad de instrucciones movidas.
+    """
+    def_counts = Counter(reg for instruction in func.code for reg in uses_defs(instruction)[1])
+    moved = 0
+    done = set()
+    while True:
+        blocks = build_blocks(func.code)
+        for loop in natural_loops(blocks):
+            # Cada ciclo se procesa una vez, identificado por su cabecera
+            header = func.code[blocks[loop.header].start]
+            if header[0] != OpCode.LABEL or header[1] in done:
+                continue
+            done.add(header[1])
+
+            result = hoist_loop(func.code, blocks, loop, def_counts)
+            if result is not None:
+                func.code[:], count = result
+                moved += count
+                # Las posiciones cambiaron, hay que recalcular los bloques
+                break
+        else:
+            return moved
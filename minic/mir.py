@@ -0,0 +1,203 @@
+# mir.py
+"""
+Formato binario MIR
+===================
+
+Este archivo permite guardar el código IR de un programa minic en un
+archivo .mir, para ejecutarlo más tarde sin volver a compilar el fuente.
+El contenido es el de un PackedProgram (ver ircode.py): la tabla de
+funciones, el pool de constantes y las instrucciones empaquetadas.
+
+Todos los números se guardan en little-endian.  Los textos se guardan
+como un u32 con su tamaño en bytes seguido del texto en UTF-8.
+
+    Encabezado
+        magic          4 bytes   b'MIR\\0'
+        version        u16
+        reservado      u16
+        funciones      u32       cantidad de funciones
+        constantes     u32       cantidad de constantes
+        instrucciones  u32       tamaño del código en palabras de 32 bits
+
+    Pool de constantes, para cada constante
+        tag            u8        0 = int, 1 = float, 2 = texto, 3 = int grande
+        valor          i64, f64, texto o texto (el int grande en decimal)
+
+    Tabla de funciones, para cada función
+        nombre         texto
+        retorno        texto     tipo IR del valor de retorno ('I', 'V', ...)
+        parámetros     u32, y para cada uno su nombre y tipo (textos)
+        variables      u32, y el nombre de cada slot (texto)
+        inicio         u32       posición en el código (en palabras)
+        tamaño         u32       tamaño del código (en palabras)
+
+    Código
+        las instrucciones de todas las funciones, como i32
+
+Para escribir y leer un programa use:
+
+    write_mir(functions, 'programa.mir')
+    program = read_mir('programa.mir')
+
+El resultado de read_mir() es un PackedProgram que el intérprete puede
+ejecutar directamente:
+
+    bash % python3 -m minic.ircode programa.c -o programa.mir
+    bash % python3 -m minic.interp programa.mir
+"""
+
+import struct
+import sys
+from array import array
+from ircode import PackedFunction, PackedProgram, pack
+
+MAGIC = b'MIR\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sHHIII')
+_U32 = struct.Struct('<I')
+_TAG = struct.Struct('<B')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+_TAG_INT, _TAG_FLOAT, _TAG_STR, _TAG_BIGINT = range(4)
+
+
+class MIRError(Exception):
+    pass
+
+
+def _pack_str(text):
+    data = text.encode('utf-8')
+    return _U32.pack(len(data)) + data
+
+
+def _pack_constant(value):
+    if isinstance(value, float):
+        return _TAG.pack(_TAG_FLOAT) + _FLOAT.pack(value)
+    elif isinstance(value, str):
+        return _TAG.pack(_TAG_STR) + _pack_str(value)
+    elif -2 ** 63 <= value < 2 ** 63:
+        return _TAG.pack(_TAG_INT) + _INT.pack(value)
+    else:
+        return _TAG.pack(_TAG_BIGINT) + _pack_str(str(value))
+
+
+def dumps(program):
+    """
+    Codifica un PackedProgram en el formato MIR
+    """
+    chunks = []
+    offset = 0
+    for func in program.functions:
+        chunks.append(_pack_str(func.name))
+        chunks.append(_pack_str(func.return_type))
+        chunks.append(_U32.pack(len(func.parameters)))
+        for pname, ptype in func.parameters:
+            chunks.append(_pack_str(pname) + _pack_str(ptype))
+        chunks.append(_U32.pack(len(func.locals)))
+        chunks.extend(_pack_str(name) for name in func.locals)
+        chunks.append(_U32.pack(offset) + _U32.pack(len(func.code)))
+        offset += len(func.code)
+
+    code = array('i')
+    for func in program.functions:
+        code.extend(func.code)
+    if sys.byteorder != 'little':
+        code.byteswap()
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, len(program.functions),
+                          len(program.constants), len(code))
+    constants = b''.join(_pack_constant(value) for value in program.constants)
+    return header + constants + b''.join(chunks) + code.tobytes()
+
+
+def loads(data):
+    """
+    Decodifica un programa en formato MIR como un PackedProgram
+    """
+    data = memoryview(data)
+    try:
+        magic, version, _, nfuncs, nconsts, ncode = _HEADER.unpack_from(data, 0)
+    except struct.error:
+        raise MIRError("File too short to be a MIR image")
+    if magic != MAGIC:
+        raise MIRError("Not a MIR image")
+    if version != VERSION:
+        raise MIRError(f"Unsupported MIR version {version}")
+
+    pos = _HEADER.size
+
+    def read_u32():
+        nonlocal pos
+        value, = _U32.unpack_from(data, pos)
+        pos += _U32.size
+        return value
+
+    def read_str():
+        nonlocal pos
+        size = read_u32()
+        text = str(data[pos:pos + size], 'utf-8')
+        pos += size
+        return text
+
+    try:
+        constants = []
+        for _ in range(nconsts):
+            tag, = _TAG.unpack_from(data, pos)
+            pos += _TAG.size
+            if tag == _TAG_INT:
+                value, = _INT.unpack_from(data, pos)
+                pos += _INT.size
+            elif tag == _TAG_FLOAT:
+                value, = _FLOAT.unpack_from(data, pos)
+                pos += _FLOAT.size
+            elif tag == _TAG_STR:
+                value = read_str()
+            elif tag == _TAG_BIGINT:
+                value = int(read_str())
+            else:
+                raise MIRError(f"Invalid constant tag {tag}")
+            constants.append(value)
+
+        table = []
+        for _ in range(nfuncs):
+            name = read_str()
+            return_type = read_str()
+            parameters = [(read_str(), read_str()) for _ in range(read_u32())]
+            local_names = [read_str() for _ in range(read_u32())]
+            start = read_u32()
+            size = read_u32()
+            table.append((name, parameters, return_type, local_names, start, size))
+
+        code = array('i')
+        code.frombytes(data[pos:pos + 4 * ncode])
+    except (struct.error, UnicodeDecodeError, ValueError):
+        raise MIRError("Corrupted MIR image")
+
+    if len(code) != ncode:
+        raise MIRError("Truncated MIR image")
+    if sys.byteorder != 'little':
+        code.byteswap()
+
+    functions = [PackedFunction(name, parameters, return_type, local_names, code[start:start + size])
+                 for name, parameters, return_type, local_names, start, size in table]
+    return PackedProgram(functions, constants)
+
+
+def write_mir(program, filename):
+    """
+    Guarda un programa (lista de Function o PackedProgram) en un archivo .mir
+    """
+    if not isinstance(program, PackedProgram):
+        program = pack(program)
+    with open(filename, 'wb') as file:
+        file.write(dumps(program))
+
+
+def read_mir(filename):
+    """
+    Carga un archivo .mir como un PackedProgram
+    """
+    with open(filename, 'rb') as file:
+        return loads(file.read())
@@ -0,0 +1,71 @@
+# output.py
+"""
+Salida del intérprete
+=====================
+
+Las instrucciones PRINT no escriben directamente en sys.stdout sino en un
+OutputSink, que acumula el texto y lo escribe en bloques.  Escribir un
+carácter por vez (como hace un programa que imprime un texto con PRINTB)
+hacía una llamada al sistema por cada carácter.
+
+La política indica cuándo se vacía el buffer:
+
+    'exit'      solo al terminar el programa (o al llamar a flush())
+    'newline'   cada vez que se escribe un salto de línea
+    'size'      cuando el buffer acumula size caracteres
+
+En todos los casos el intérprete vacía el buffer al terminar, aunque el
+programa falle.  MemoryOutput guarda la salida en memoria, para las
+pruebas y los benchmarks.
+"""
+
+import io
+import sys
+
+FLUSH_POLICIES = ('exit', 'newline', 'size')
+
+
+class OutputSink:
+    """
+    Buffer de salida sobre un stream.  Si stream es None se usa el
+    sys.stdout vigente al momento de vaciar el buffer.
+    """
+
+    def __init__(self, stream=None, policy='size', size=8192):
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{policy}'")
+        self.stream = stream
+        self.policy = policy
+        self.size = size
+        self.parts = []
+        self.pending = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.policy == 'newline':
+            if '\n' in text:
+                self.flush()
+        elif self.policy == 'size' and self.pending >= self.size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            stream = self.stream or sys.stdout
+            stream.write(''.join(self.parts))
+            stream.flush()
+            self.parts = []
+            self.pending = 0
+
+
+class MemoryOutput(OutputSink):
+    """
+    Guarda la salida del programa en memoria
+    """
+
+    def __init__(self):
+        super().__init__(io.StringIO(), policy='exit')
+
+    def getvalue(self):
+        self.flush()
+        return self.stream.getvalue()
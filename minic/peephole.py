@@ -0,0 +1,215 @@
+# peephole.py
+"""
+Simplificación algebraica
+=========================
+
+Pasada sobre el código IR (en forma SSA) de cada función que reemplaza
+operaciones aritméticas por otras equivalentes y más baratas:
+
+    x * 2^k   ->  SHLI  x, k          (desplazamiento a la izquierda)
+    x / 2^k   ->  SHRI  x, k          (si x no es negativo)
+    x % 2^k   ->  MASKI x, 2^k - 1    (si x no es negativo)
+    x * 1, 1 * x, x + 0, 0 + x, x - 0   ->  COPY x
+    0 - x     ->  NEGI x
+
+Las constantes se reconocen por los registros cargados con MOVI o MOVF.
+Para saber que un valor no es negativo se hace un análisis sencillo: las
+constantes positivas, y las sumas, productos, desplazamientos y máscaras
+de valores no negativos lo son.  Las variables locales también, si
+todo lo que se guarda en ellas cumple esa condición (los parámetros se
+consideran desconocidos).  Este análisis supone enteros sin límite: con
+enteros de ancho fijo (el modo int_bits de interp.py) una suma o un
+producto de valores no negativos puede desbordarse y dar un negativo, así
+que en ese modo no se reemplazan las divisiones ni los restos.
+
+Luego se eliminan las copias, reemplazando cada uso del registro copiado
+por el original, y las instrucciones sin efectos cuyo resultado ya no se
+usa (por ejemplo, el MOVI 0 de una negación).
+"""
+
+from collections import Counter
+from cfg import uses_defs
+from ircode import OpCode, operand_kinds
+
+# Instrucciones sin efectos secundarios: se pueden borrar si nadie usa
+# su resultado
+PURE_OPS = {
+    OpCode.MOVI, OpCode.MOVF, OpCode.MOVB,
+    OpCode.LOADLI, OpCode.LOADLF, OpCode.LOADLB,
+    OpCode.LOADGI, OpCode.LOADGF, OpCode.LOADGB,
+    OpCode.ALOADLI, OpCode.ALOADLF, OpCode.ALOADLB,
+    OpCode.ALOADGI, OpCode.ALOADGF, OpCode.ALOADGB,
+    OpCode.ADDI, OpCode.ADDF, OpCode.SUBI, OpCode.SUBF,
+    OpCode.MULI, OpCode.MULF,
+    OpCode.CMPI, OpCode.CMPF, OpCode.CMPB,
+    OpCode.AND, OpCode.OR, OpCode.XOR,
+    OpCode.SHLI, OpCode.SHRI, OpCode.MASKI, OpCode.NEGI, OpCode.NEGF,
+    OpCode.COPY, OpCode.ADDKI, OpCode.ADDKF, OpCode.MULKI, OpCode.MULKF,
+    OpCode.CMPKI, OpCode.CMPKF, OpCode.CMPKB,
+    OpCode.AREFL, OpCode.AREFG,
+}
+
+LOCAL_STORES = {OpCode.STORELI, OpCode.STORELF, OpCode.STORELB}
+
+
+def power_of_two(value):
+    """
+    Devuelve k si value es 2^k (con k > 0), o None
+    """
+    if isinstance(value, int) and value > 1 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
+
+def non_negative_registers(func, constants, def_counts):
+    """
+    Devuelve el conjunto de registros cuyo valor nunca es negativo.  Solo
+    se consideran los registros que se definen una sola vez.
+    """
+    code = func.code
+    params = len(func.parameters)
+
+    # Se parte suponiendo que todas las variables locales (menos los
+    # parámetros) son no negativas, y se descartan las que no lo son
+    # hasta que no haya cambios
+    slots = set(range(params, len(func.locals)))
+    while True:
+        registers = {reg for reg, value in constants.items() if value >= 0}
+        for instruction in code:
+            op_code = instruction[0]
+            uses, defs = uses_defs(instruction)
+            if op_code == OpCode.LOADLI:
+                known = instruction[1] in slots
+            elif op_code in (OpCode.ADDI, OpCode.MULI, OpCode.AND, OpCode.OR):
+                known = all(reg in registers for reg in uses)
+            elif op_code in (OpCode.SHLI, OpCode.SHRI, OpCode.DIVI):
+                known = uses[0] in registers and (op_code != OpCode.DIVI or uses[1] in registers)
+            elif op_code in (OpCode.MASKI, OpCode.CMPI, OpCode.CMPF, OpCode.CMPB):
+                known = True
+            elif op_code == OpCode.REMI:
+                known = uses[0] in registers and constants.get(uses[1], 0) > 0
+            elif op_code == OpCode.COPY:
+                known = uses[0] in registers
+            else:
+                known = False
+            if known:
+                registers.update(reg for reg in defs if def_counts[reg] == 1)
+
+        bad = set()
+        for instruction in code:
+            op_code = instruction[0]
+            if op_code in LOCAL_STORES and instruction[1] not in registers:
+                bad.add(instruction[2])
+            elif op_code == OpCode.LOOPLI and instruction[2] < 0:
+                bad.add(instruction[1])
+            elif op_code in (OpCode.INCLI, OpCode.ADDLI, OpCode.INCLF, OpCode.ADDLF):
+                bad.add(instruction[1])
+            elif op_code == OpCode.STORELKI and instruction[1] < 0:
+                bad.add(instruction[2])
+            elif op_code in (OpCode.ALLOCF, OpCode.AALLOCI, OpCode.AALLOCF, OpCode.AALLOCB):
+                bad.add(instruction[1])
+
+        if not bad & slots:
+            return registers
+        slots -= bad
+
+
+def rewrite(instruction, constants, non_negative):
+    """
+    Devuelve la instrucción simplificada
+    """
+    op_code = instruction[0]
+    if op_code in (OpCode.MULI, OpCode.MULF, OpCode.ADDI, OpCode.ADDF, OpCode.SUBI, OpCode.SUBF):
+        _, left, right, target = instruction
+        lvalue = constants.get(left)
+        rvalue = constants.get(right)
+        is_int = op_code in (OpCode.MULI, OpCode.ADDI, OpCode.SUBI)
+
+        if op_code in (OpCode.MULI, OpCode.MULF):
+            if rvalue == 1:
+                return OpCode.COPY, left, target
+            if lvalue == 1:
+                return OpCode.COPY, right, target
+            if is_int and power_of_two(rvalue):
+                return OpCode.SHLI, left, power_of_two(rvalue), target
+            if is_int and power_of_two(lvalue):
+                return OpCode.SHLI, right, power_of_two(lvalue), target
+        elif op_code in (OpCode.SUBI, OpCode.SUBF):
+            if rvalue == 0:
+                return OpCode.COPY, left, target
+            if is_int and lvalue == 0:
+                # 0.0 - x no es -x si x es 0.0
+                return OpCode.NEGI, right, target
+        elif is_int:
+            # x + 0.0 no es una copia si x es -0.0
+            if rvalue == 0:
+                return OpCode.COPY, left, target
+            if lvalue == 0:
+                return OpCode.COPY, right, target
+
+    elif op_code in (OpCode.DIVI, OpCode.REMI):
+        _, left, right, target = instruction
+        k = power_of_two(constants.get(right))
+        if k and left in non_negative:
+            if op_code == OpCode.DIVI:
+                return OpCode.SHRI, left, k, target
+            return OpCode.MASKI, left, (1 << k) - 1, target
+
+    return instruction
+
+
+def propagate_copies(code, def_counts):
+    """
+    Elimina las instrucciones COPY reemplazando los usos del destino por
+    el registro original
+    """
+    replace = {}
+    for instruction in code:
+        if instruction[0] == OpCode.COPY:
+            _, source, target = instruction
+            if def_counts[target] == 1 and def_counts[source] == 1:
+                replace[target] = replace.get(source, source)
+
+    if not replace:
+        return code
+
+    return [
+        (instruction[0], *[replace.get(operand, operand) if kind == 'r' else operand
+                           for kind, operand in zip(operand_kinds(instruction), instruction[1:])])
+        for instruction in code
+        if not (instruction[0] == OpCode.COPY and instruction[2] in replace)
+    ]
+
+
+def remove_dead_code(code):
+    """
+    Elimina las instrucciones sin efectos cuyo resultado no se usa
+    """
+    while True:
+        used = Counter(reg for instruction in code for reg in uses_defs(instruction)[0])
+        live = [instruction for instruction in code
+                if instruction[0] not in PURE_OPS or any(used[reg] for reg in uses_defs(instruction)[1])]
+        if len(live) == len(code):
+            return code
+        code = live
+
+
+def simplify(func, int_bits=None):
+    """
+    Aplica la simplificación algebraica a una función.  Devuelve la
+    cantidad de instrucciones eliminadas.  int_bits es el ancho de los
+    enteros con que se va a ejecutar el código, o None si no tienen límite.
+    """
+    size = len(func.code)
+    def_counts = Counter(reg for instruction in func.code for reg in uses_defs(instruction)[1])
+    constants = {instruction[2]: instruction[1] for instruction in func.code
+                 if instruction[0] in (OpCode.MOVI, OpCode.MOVF) and def_counts[instruction[2]] == 1}
+    if int_bits is None:
+        non_negative = non_negative_registers(func, constants, def_counts)
+    else:
+        non_negative = set()
+
+    code = [rewrite(instruction, constants, non_negative) for instruction in func.code]
+    code = propagate_copies(code, def_counts)
+    func.code[:] = remove_dead_code(code)
+    return size - len(func.code)
@@ -0,0 +1,107 @@
+# phases.py
+"""
+Medición de las fases del compilador
+====================================
+
+compile_ircode() (ver ircode.py) puede medir cada una de sus fases: el
+análisis léxico, el sintáctico, el chequeo de tipos, la generación de
+código y cada pasada de optimización.  Para cada fase se guarda un
+PhaseStats con el tiempo transcurrido, el pico de memoria reservada
+durante la fase (medido con tracemalloc) y, según la fase, la cantidad
+de tokens, de nodos del AST o de instrucciones IR que produjo.
+
+Desde Python:
+
+    phases = []
+    compile_ircode(source, phases=phases)
+    for stats in phases:
+        print(stats.name, stats.wall_time, stats.peak_memory)
+
+Desde la línea de comandos:
+
+    bash % python3 -m minic.ircode programa.c --time-phases
+"""
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class PhaseStats:
+    """
+    Mediciones de una fase del compilador.  Los contadores que no
+    corresponden a la fase quedan en None.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.peak_memory = 0  # bytes
+        self.tokens = None
+        self.ast_nodes = None
+        self.instructions = None
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"PhaseStats({self.name!r}, {self.wall_time:.6f}s, {self.peak_memory} bytes)"
+
+
+class PhaseTimer:
+    """
+    Mide fases consecutivas y agrega su PhaseStats a la lista phases.  Si
+    phases es None no se mide nada.  Con trace_memory=False no se mide la
+    memoria, ya que tracemalloc hace más lento todo el compilador.
+    """
+
+    def __init__(self, phases, trace_memory=True):
+        self.phases = phases
+        self.trace_memory = trace_memory and phases is not None
+        self.started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def phase(self, name):
+        stats = PhaseStats(name)
+        if self.phases is None:
+            yield stats
+            return
+
+        if self.trace_memory:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_time = time.perf_counter() - start
+            if self.trace_memory:
+                stats.peak_memory = max(tracemalloc.get_traced_memory()[1] - base, 0)
+            self.phases.append(stats)
+
+
+def format_phases(phases):
+    """
+    Tabla legible con las mediciones de cada fase
+    """
+    def count(value):
+        return '-' if value is None else str(value)
+
+    lines = [f"{'phase':<12}{'time (ms)':>12}{'peak (KiB)':>12}{'tokens':>10}{'nodes':>10}{'IR':>10}"]
+    for stats in phases:
+        lines.append(f"{stats.name:<12}{stats.wall_time * 1000:>12.2f}{stats.peak_memory / 1024:>12.1f}"
+                     f"{count(stats.tokens):>10}{count(stats.ast_nodes):>10}{count(stats.instructions):>10}")
+    total = sum(stats.wall_time for stats in phases)
+    lines.append(f"{'total':<12}{total * 1000:>12.2f}")
+    return '\n'.join(lines)
@@ -0,0 +1,119 @@
+# regalloc.py
+"""
+Asignación de registros
+=======================
+
+El generador de código usa un registro virtual nuevo para cada valor
+temporal (SSA), con un contador común a todo el programa.  Un programa
+grande termina usando cientos de miles de registros distintos.
+
+Esta pasada asigna los registros virtuales de cada función a un conjunto
+pequeño de registros físicos R0, R1, ... que se reutilizan, usando el
+algoritmo de "linear scan":
+
+1.  Se numeran las instrucciones en orden y se calcula, con el análisis
+    de registros vivos sobre los bloques básicos (cfg.py), el intervalo
+    [inicio, fin] en el que cada registro virtual tiene un valor útil.
+
+2.  Se recorren los intervalos ordenados por su inicio.  Los intervalos
+    que ya terminaron liberan su registro físico, y cada intervalo nuevo
+    toma el menor registro libre.
+
+Como los registros son propios de cada llamada a función, nunca hace
+falta guardar registros en memoria (spilling).  Después de esta pasada
+el código ya no es SSA, así que debe ejecutarse después de cualquier
+otra pasada de optimización.
+"""
+
+import heapq
+from cfg import build_blocks, liveness, uses_defs
+from ircode import operand_kinds
+
+
+class Interval:
+    """
+    Rango de instrucciones en el que un registro virtual está vivo
+    """
+
+    def __init__(self, register, position):
+        self.register = register
+        self.start = position
+        self.end = position
+        # Indica si el registro se escribe en la instrucción inicial
+        self.defined_at_start = False
+
+    def extend(self, position):
+        self.start = min(self.start, position)
+        self.end = max(self.end, position)
+
+
+def live_intervals(code):
+    """
+    Calcula el intervalo de vida de cada registro virtual
+    """
+    intervals = {}
+
+    def touch(register, position):
+        if register in intervals:
+            intervals[register].extend(position)
+        else:
+            intervals[register] = Interval(register, position)
+
+    blocks = build_blocks(code)
+    live_in, live_out = liveness(code, blocks)
+    for block in blocks:
+        for register in live_in[block.index]:
+            touch(register, block.start)
+        for register in live_out[block.index]:
+            touch(register, block.end - 1)
+
+    for position, instruction in enumerate(code):
+        uses, defs = uses_defs(instruction)
+        for register in uses:
+            touch(register, position)
+        for register in defs:
+            touch(register, position)
+
+    for position, instruction in enumerate(code):
+        for register in uses_defs(instruction)[1]:
+            if intervals[register].start == position:
+                intervals[register].defined_at_start = True
+
+    return intervals
+
+
+def allocate_registers(func):
+    """
+    Reescribe el código de la función usando registros físicos.  Devuelve
+    la cantidad de registros físicos utilizados.
+    """
+    intervals = sorted(live_intervals(func.code).values(),
+                       key=lambda interval: (interval.start, not interval.defined_at_start))
+
+    mapping = {}
+    free = []  # heap de registros físicos libres
+    active = []  # heap de (fin, número, registro físico)
+    count = 0
+    for n, interval in enumerate(intervals):
+        # Liberar los intervalos que ya terminaron.  Un registro leído por
+        # última vez en la instrucción que define al nuevo puede reutilizarse
+        while active and (active[0][0] < interval.start or
+                          (active[0][0] == interval.start and interval.defined_at_start)):
+            _, _, physical = heapq.heappop(active)
+            heapq.heappush(free, physical)
+
+        if free:
+            physical = heapq.heappop(free)
+        else:
+            physical = count
+            count += 1
+
+        mapping[interval.register] = f"R{physical}"
+        heapq.heappush(active, (interval.end, n, physical))
+
+    func.code[:] = [
+        (instruction[0], *[mapping[operand] if kind in 'rw' else operand
+                           for kind, operand in zip(operand_kinds(instruction), instruction[1:])])
+        for instruction in func.code
+    ]
+    return count
@@ -0,0 +1,192 @@
+# scaling.py
+"""
+Pruebas de escalabilidad del compilador
+=======================================
+
+Compila programas generados con synth.py de tamaño creciente, variando
+una dimensión a la vez (cantidad de funciones, sentencias por bloque,
+profundidad de anidamiento o largo de las expresiones), y mide el tiempo
+y el pico de memoria de cada fase de compile_ircode() (ver phases.py).
+
+Para cada dimensión y fase se estima el exponente k del crecimiento
+tiempo ~ tamaño^k, con el tamaño del fuente en caracteres (el largo de
+las expresiones casi no cambia la cantidad de líneas), mediante una
+regresión sobre los logaritmos.  Un exponente
+claramente mayor que 1 indica un comportamiento peor que lineal.
+
+Si matplotlib está instalado, --plot guarda un gráfico con una curva
+por fase; si no, solo se muestran las tablas.
+
+    bash % python3 -m minic.scaling --plot scaling.png --json scaling.json
+"""
+
+import argparse
+import json
+import math
+import sys
+
+from errors import clear_errors, errors_reported
+from ircode import compile_ircode
+from synth import generate_program
+
+# Valores por defecto de cada dimensión, y los tamaños a probar
+DEFAULTS = {'functions': 10, 'statements': 4, 'depth': 2, 'expr_length': 4}
+SIZES = {
+    'functions': [5, 10, 20, 40, 80],
+    'statements': [2, 3, 4, 6, 8],
+    'depth': [1, 2, 3, 4],
+    'expr_length': [2, 4, 8, 16, 32],
+}
+
+# Exponente a partir del cual una fase se marca como peor que lineal
+SUPERLINEAR = 1.3
+
+
+def measure(source, repeat):
+    """
+    Compila source y devuelve {fase: (segundos, bytes)}.  El tiempo es el
+    mejor de repeat compilaciones sin tracemalloc; la memoria se mide en
+    una compilación aparte.
+    """
+    def compile_phases(trace_memory):
+        clear_errors()
+        phases = []
+        compile_ircode(source, phases=phases, trace_memory=trace_memory)
+        if errors_reported():
+            raise RuntimeError("generated program does not compile")
+        return phases
+
+    times = {}
+    for _ in range(repeat):
+        for stats in compile_phases(False):
+            times[stats.name] = min(times.get(stats.name, stats.wall_time), stats.wall_time)
+    memory = {stats.name: stats.peak_memory for stats in compile_phases(True)}
+    return {phase: (seconds, memory[phase]) for phase, seconds in times.items()}
+
+
+def run_scaling(dimensions, repeat=3, seed=0):
+    """
+    Devuelve una lista de filas {dimension, value, lines, size, phase, time, memory}
+    """
+    rows = []
+    for dimension in dimensions:
+        for value in SIZES[dimension]:
+            params = dict(DEFAULTS, **{dimension: value})
+            source = generate_program(seed=seed, **params)
+            lines = source.count('\n')
+            for phase, (seconds, memory) in measure(source, repeat).items():
+                rows.append({'dimension': dimension, 'value': value, 'lines': lines, 'size': len(source),
+                             'phase': phase, 'time': seconds, 'memory': memory})
+    return rows
+
+
+def growth_exponent(points):
+    """
+    Pendiente de la recta que mejor aproxima log(y) en función de log(x)
+    """
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def exponents(rows):
+    """
+    Devuelve {(dimensión, fase): exponente del tiempo respecto al tamaño}
+    """
+    series = {}
+    for row in rows:
+        series.setdefault((row['dimension'], row['phase']), []).append((row['size'], row['time']))
+    return {key: growth_exponent(points) for key, points in series.items()}
+
+
+def format_rows(rows):
+    lines = [f"{'dimension':<12}{'value':>6}{'lines':>8}  {'phase':<10}{'time (ms)':>11}{'peak (KiB)':>12}"]
+    for row in rows:
+        lines.append(f"{row['dimension']:<12}{row['value']:>6}{row['lines']:>8}  {row['phase']:<10}"
+                     f"{row['time'] * 1000:>11.2f}{row['memory'] / 1024:>12.1f}")
+    return '\n'.join(lines)
+
+
+def format_exponents(growth):
+    lines = [f"{'dimension':<12}{'phase':<10}{'exponent':>10}"]
+    for (dimension, phase), exponent in growth.items():
+        if exponent is None:
+            continue
+        mark = '  super-linear' if exponent > SUPERLINEAR else ''
+        lines.append(f"{dimension:<12}{phase:<10}{exponent:>10.2f}{mark}")
+    return '\n'.join(lines)
+
+
+def plot(rows, filename):
+    """
+    Guarda un gráfico de tiempo y memoria por fase para cada dimensión.
+    Devuelve False si matplotlib no está instalado.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    dimensions = list(dict.fromkeys(row['dimension'] for row in rows))
+    figure, axes = plt.subplots(len(dimensions), 2, figsize=(12, 4 * len(dimensions)), squeeze=False)
+    for n, dimension in enumerate(dimensions):
+        selected = [row for row in rows if row['dimension'] == dimension]
+        for phase in dict.fromkeys(row['phase'] for row in selected):
+            points = [row for row in selected if row['phase'] == phase]
+            sizes = [row['size'] for row in points]
+            axes[n][0].plot(sizes, [row['time'] * 1000 for row in points], marker='o', label=phase)
+            axes[n][1].plot(sizes, [row['memory'] / 1024 for row in points], marker='o', label=phase)
+        axes[n][0].set_title(f"{dimension}: time")
+        axes[n][0].set_xlabel('characters')
+        axes[n][0].set_ylabel('ms')
+        axes[n][1].set_title(f"{dimension}: peak memory")
+        axes[n][1].set_xlabel('characters')
+        axes[n][1].set_ylabel('KiB')
+        axes[n][0].legend(fontsize='small')
+
+    figure.tight_layout()
+    figure.savefig(filename)
+    plt.close(figure)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 -m minic.scaling')
+    parser.add_argument('dimensions', nargs='*',
+                        help=f"dimensiones a variar: {', '.join(SIZES)} (todas si no se indica)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help='guardar las mediciones en JSON')
+    parser.add_argument('--plot', metavar='FILE', help='guardar un gráfico (requiere matplotlib)')
+    args = parser.parse_args()
+    for dimension in args.dimensions:
+        if dimension not in SIZES:
+            parser.error(f"unknown dimension '{dimension}'")
+
+    rows = run_scaling(args.dimensions or list(SIZES), args.repeat, args.seed)
+    growth = exponents(rows)
+    print(format_rows(rows))
+    print()
+    print(format_exponents(growth))
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'rows': rows,
+                       'exponents': [{'dimension': dimension, 'phase': phase, 'exponent': exponent}
+                                     for (dimension, phase), exponent in growth.items()]},
+                      file, indent=2)
+
+    if args.plot and not plot(rows, args.plot):
+        sys.stderr.write("matplotlib is not installed; skipping the plot\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+# superinst.py
+"""
+Superinstrucciones
+==================
+
+El costo del intérprete está dominado por el despacho de cada
+instrucción, y el código IR es muy detallado: x = x + 1 son cuatro
+instrucciones (LOADLI, MOVI, ADDI, STORELI) y la condición de un while
+otras tres.  Esta pasada reemplaza las secuencias más frecuentes por una
+sola instrucción que hace el mismo trabajo:
+
+    LOADLI s, R1                         (con R2 cargado con MOVI k)
+    ADDI   R1, R2, R3      ==>   INCLI  s, k
+    STORELI R3, s
+
+    LOADLI s, R1
+    ADDI   R1, R2, R3      ==>   ADDLI  s, R2
+    STORELI R3, s
+
+    LOADLI s, R1
+    BLTI   R1, R2, L1, L2  ==>   CMPBRLI <, s, R2, L1, L2
+
+(y sus equivalentes F, B y para variables globales).  Las secuencias se
+eligieron contando, con mine_patterns(), cuántas veces se ejecuta cada
+secuencia de instrucciones de un mismo bloque en los programas de
+benchmarks/:
+
+    bash % python3 -m minic.superinst --length 3
+    bash % python3 -m minic.superinst --no-fuse programa.c
+
+La carga no tiene que estar justo antes de la instrucción que la usa,
+basta con que esté en el mismo bloque, que su registro no se use en otro
+lugar y que entre ambas nadie modifique la variable (una llamada puede
+modificar cualquier variable global).  Como se cuentan los usos de cada
+registro en toda la función, la pasada debe ejecutarse mientras el código
+todavía está en forma SSA, antes de asignar registros.
+"""
+
+from collections import Counter
+from cfg import build_blocks, uses_defs, COMPARE_BRANCH_OPS, TERMINATORS
+from ircode import OpCode, SWAPPED_COMPARE_OPS
+from peephole import remove_dead_code
+
+# Cargas y escrituras de variables escalares: {código: (ámbito, tipo)}
+LOADS = {
+    OpCode.LOADLI: ('L', 'I'), OpCode.LOADLF: ('L', 'F'), OpCode.LOADLB: ('L', 'B'),
+    OpCode.LOADGI: ('G', 'I'), OpCode.LOADGF: ('G', 'F'), OpCode.LOADGB: ('G', 'B'),
+}
+STORES = {
+    OpCode.STORELI: ('L', 'I'), OpCode.STORELF: ('L', 'F'), OpCode.STORELB: ('L', 'B'),
+    OpCode.STOREGI: ('G', 'I'), OpCode.STOREGF: ('G', 'F'), OpCode.STOREGB: ('G', 'B'),
+    OpCode.STORELKI: ('L', 'I'), OpCode.STORELKF: ('L', 'F'), OpCode.STORELKB: ('L', 'B'),
+    OpCode.STOREGKI: ('G', 'I'), OpCode.STOREGKF: ('G', 'F'), OpCode.STOREGKB: ('G', 'B'),
+}
+
+# Otras instrucciones que modifican la variable de su primer operando
+SLOT_WRITES = {
+    OpCode.LOOPLI: 'L', OpCode.LOOPGI: 'G',
+    OpCode.INCLI: 'L', OpCode.INCLF: 'L', OpCode.INCGI: 'G', OpCode.INCGF: 'G',
+    OpCode.ADDLI: 'L', OpCode.ADDLF: 'L', OpCode.ADDGI: 'G', OpCode.ADDGF: 'G',
+}
+
+ADDS = {OpCode.ADDI: 'I', OpCode.ADDF: 'F'}
+SUBS = {OpCode.SUBI: 'I', OpCode.SUBF: 'F'}
+
+
+def fuse_block(code, start, end, constants, use_counts):
+    """
+    Reemplaza las secuencias del bloque [start, end).  Las instrucciones
+    absorbidas por una superinstrucción quedan en None.
+    """
+    # Cargas pendientes: registro -> (posición, ámbito, tipo, slot)
+    loads = {}
+
+    def forget(scope, slot=None):
+        for reg, (_, lscope, _, lslot) in list(loads.items()):
+            if lscope == scope and (slot is None or lslot == slot):
+                del loads[reg]
+
+    for pc in range(start, end):
+        instruction = code[pc]
+        op_code = instruction[0]
+
+        if op_code in LOADS:
+            scope, type_code = LOADS[op_code]
+            if use_counts[instruction[2]] == 1:
+                loads[instruction[2]] = (pc, scope, type_code, instruction[1])
+
+        elif op_code in ADDS or op_code in SUBS:
+            _, left, right, target = instruction
+            type_code = ADDS.get(op_code) or SUBS[op_code]
+            sign = 1 if op_code in ADDS else -1
+            if op_code in ADDS:
+                # x = x + y  y  x = y + x
+                candidates = ((left, right), (right, left))
+            else:
+                # x = x - k
+                candidates = ((left, right),) if right in constants else ()
+
+            store = code[pc + 1] if pc + 1 < end else None
+            if store is not None and store[0] in STORES and store[1] == target and use_counts[target] == 1:
+                scope = STORES[store[0]][0]
+                for reg, other in candidates:
+                    if reg in loads and loads[reg][1:] == (scope, type_code, store[2]):
+                        code[loads.pop(reg)[0]] = None
+                        code[pc] = None
+                        if other in constants:
+                            code[pc + 1] = (OpCode[f'INC{scope}{type_code}'], store[2], sign * constants[other])
+                        else:
+                            code[pc + 1] = (OpCode[f'ADD{scope}{type_code}'], store[2], other)
+                        break
+
+        elif op_code in COMPARE_BRANCH_OPS:
+            op, type_code = COMPARE_BRANCH_OPS[op_code]
+            _, left, right, true_label, false_label = instruction
+            for reg, other, reg_op in ((left, right, op), (right, left, SWAPPED_COMPARE_OPS[op])):
+                if reg in loads and loads[reg][2] == type_code:
+                    position, scope, _, slot = loads.pop(reg)
+                    code[position] = None
+                    code[pc] = (OpCode[f'CMPBR{scope}{type_code}'], reg_op, slot, other, true_label, false_label)
+                    break
+
+        # Una escritura invalida las cargas pendientes de esa variable
+        if op_code in STORES:
+            forget(STORES[op_code][0], instruction[2])
+        elif op_code in SLOT_WRITES:
+            forget(SLOT_WRITES[op_code], instruction[1])
+        elif op_code == OpCode.CALL:
+            forget('G')
+
+
+def fuse(func):
+    """
+    Aplica la pasada a una función.  Devuelve la cantidad de instrucciones
+    eliminadas.
+    """
+    code = list(func.code)
+    use_counts = Counter(reg for instruction in code for reg in uses_defs(instruction)[0])
+    def_counts = Counter(reg for instruction in code for reg in uses_defs(instruction)[1])
+    constants = {instruction[2]: instruction[1] for instruction in code
+                 if instruction[0] in (OpCode.MOVI, OpCode.MOVF) and def_counts[instruction[2]] == 1}
+
+    for block in build_blocks(code):
+        fuse_block(code, block.start, block.end, constants, use_counts)
+
+    size = len(func.code)
+    func.code[:] = remove_dead_code([instruction for instruction in code if instruction is not None])
+    return size - len(func.code)
+
+
+def mine_patterns(sources, length=2, superinstructions=True):
+    """
+    Ejecuta cada programa con ProfilingInterpreter y devuelve un Counter
+    con la cantidad de veces que se ejecutó cada secuencia de length
+    códigos de operación consecutivos de un mismo bloque básico
+    """
+    from errors import clear_errors, errors_reported
+    from interp import ProfilingInterpreter
+    from ircode import compile_ircode
+    from output import MemoryOutput
+
+    patterns = Counter()
+    for source in sources:
+        clear_errors()
+        code = compile_ircode(source, superinstructions=superinstructions)
+        if errors_reported():
+            raise RuntimeError("program does not compile")
+        profiler = ProfilingInterpreter(MemoryOutput())
+        profiler.execute(code)
+
+        for name, counts in profiler.instruction_counts.items():
+            op_codes = profiler.op_codes[name]
+            for pc in range(len(op_codes) - length + 1):
+                window = op_codes[pc:pc + length]
+                # Las etiquetas no se ejecutan como parte de una secuencia
+                if OpCode.LABEL in window or any(op in TERMINATORS for op in window[:-1]):
+                    continue
+                if counts[pc]:
+                    patterns[tuple(op.name for op in window)] += counts[pc]
+    return patterns
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python3 -m minic.superinst')
+    parser.add_argument('filenames', nargs='*', help='programas a analizar (benchmarks/ si no se indica)')
+    parser.add_argument('--length', type=int, default=2, help='largo de las secuencias')
+    parser.add_argument('--top', type=int, default=20, help='cantidad de secuencias a mostrar')
+    parser.add_argument('--no-fuse', action='store_true',
+                        help='analizar el código sin superinstrucciones')
+    args = parser.parse_args()
+
+    if args.filenames:
+        sources = [open(filename).read() for filename in args.filenames]
+    else:
+        from bench import load_benchmarks
+
+        sources = [source for _, source, _, execute in load_benchmarks() if execute]
+
+    patterns = mine_patterns(sources, args.length, not args.no_fuse)
+    total = sum(patterns.values())
+    print(f"{'count':>12}{'share':>8}  sequence")
+    for sequence, count in patterns.most_common(args.top):
+        print(f"{count:>12}{count / total:>8.1%}  {' '.join(sequence)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# synth.py
+"""
+Generador de programas sintéticos
+=================================
+
+Genera programas minic válidos (que pasan el chequeo de tipos) de tamaño
+arbitrario, para medir cómo escala el compilador.  Los parámetros de
+generate_program() controlan cada dimensión por separado:
+
+    functions      cantidad de funciones
+    statements     sentencias en cada bloque
+    depth          profundidad máxima de anidamiento de if/while/for
+    expr_length    cantidad de operandos de cada expresión
+
+Cada función recibe dos enteros y declara sus variables al comienzo del
+bloque.  Las funciones pares no llaman a nadie y las impares solo llaman
+a las funciones pares definidas antes, así no hay recursión y el tiempo
+de ejecución no crece en forma exponencial.  Las divisiones son siempre
+por constantes distintas de cero y los ciclos tienen un contador que el
+cuerpo no modifica, de modo que los programas también se pueden
+ejecutar.
+
+    bash % python3 -m minic.synth --functions 50 --depth 3 > big.c
+"""
+
+import argparse
+import random
+
+GLOBAL_ARRAY_SIZE = 16
+LOCALS = ('x0', 'x1', 'x2', 'x3')
+
+
+class ProgramGenerator:
+    """
+    Genera el texto de un programa a partir de una semilla
+    """
+
+    def __init__(self, functions=10, statements=6, depth=2, expr_length=4, seed=0):
+        self.functions = functions
+        self.statements = statements
+        self.depth = depth
+        self.expr_length = expr_length
+        self.random = random.Random(seed)
+        self.lines = []
+        self.indent = 0
+        self.leaves = []  # funciones ya definidas que no llaman a otras
+        self.calls = False  # si la función actual puede hacer llamadas
+
+    def emit(self, line):
+        self.lines.append('    ' * self.indent + line)
+
+    # Expresiones
+
+    def int_operand(self, calls=True):
+        choice = self.random.random()
+        if choice < 0.25:
+            return str(self.random.randint(0, 99))
+        if choice < 0.55:
+            return self.random.choice(LOCALS + ('a', 'b'))
+        if choice < 0.7:
+            return self.random.choice(('g0', 'g1'))
+        if choice < 0.85:
+            return f"G[{self.random.randrange(GLOBAL_ARRAY_SIZE)}]"
+        if calls and self.calls and self.leaves:
+            name = self.random.choice(self.leaves)
+            return f"{name}({self.int_operand(False)}, {self.int_operand(False)})"
+        return str(self.random.randint(1, 9))
+
+    def int_expr(self, length=None):
+        length = length or self.expr_length
+        expr = self.int_operand()
+        for _ in range(length - 1):
+            op = self.random.choice(('+', '-', '*', '/', '%'))
+            if op in ('/', '%'):
+                # Divisor constante, nunca cero
+                expr = f"({expr}) {op} {self.random.randint(1, 9)}"
+            else:
+                expr = f"{expr} {op} {self.int_operand()}"
+        return expr
+
+    def float_expr(self):
+        expr = 'y'
+        for _ in range(self.expr_length - 1):
+            op = self.random.choice(('+', '-', '*'))
+            operand = self.random.choice(('y', 'h', f"{self.random.randint(0, 9)}.5"))
+            expr = f"{expr} {op} {operand}"
+        return expr
+
+    def condition(self):
+        ops = ('<', '<=', '>', '>=', '==', '!=')
+        cond = f"{self.int_expr(2)} {self.random.choice(ops)} {self.int_expr(2)}"
+        if self.random.random() < 0.3:
+            joiner = self.random.choice(('&&', '||'))
+            cond = f"{cond} {joiner} !({self.int_operand(False)} > {self.random.randint(0, 99)})"
+        return cond
+
+    # Sentencias
+
+    def block(self, level):
+        self.indent += 1
+        for _ in range(self.statements):
+            self.statement(level)
+        self.indent -= 1
+
+    def statement(self, level):
+        choice = self.random.random()
+        if level < self.depth and choice < 0.15:
+            self.emit(f"if ({self.condition()}) {{")
+            self.block(level + 1)
+            self.emit("} else {")
+            self.block(level + 1)
+            self.emit("}")
+        elif level < self.depth and choice < 0.25:
+            counter = f"i{level}"
+            self.emit(f"{counter} = 0;")
+            self.emit(f"while ({counter} < {self.random.randint(1, 4)}) {{")
+            self.block(level + 1)
+            self.indent += 1
+            self.emit(f"{counter} = {counter} + 1;")
+            self.indent -= 1
+            self.emit("}")
+        elif level < self.depth and choice < 0.35:
+            counter = f"i{level}"
+            self.emit(f"for ({counter} = 0; {counter} < {self.random.randint(1, 4)}; {counter}++) {{")
+            self.block(level + 1)
+            self.emit("}")
+        elif choice < 0.5:
+            index = self.random.randrange(GLOBAL_ARRAY_SIZE)
+            self.emit(f"G[{index}] = ({self.int_expr()}) % 1000;")
+        elif choice < 0.6:
+            self.emit(f"y = {self.float_expr()};")
+        elif choice < 0.65:
+            self.emit(f"print({self.random.choice(LOCALS)});")
+        else:
+            # Se acota el valor para que los enteros no crezcan sin límite
+            self.emit(f"{self.random.choice(LOCALS)} = ({self.int_expr()}) % 1000;")
+
+    def function(self, n):
+        name = f"fn{n}"
+        self.calls = n % 2 == 1
+        self.emit(f"int {name}(int a, int b) {{")
+        self.indent += 1
+        for local in LOCALS:
+            self.emit(f"int {local} = {self.random.randint(0, 9)};")
+        for level in range(self.depth):
+            self.emit(f"int i{level};")
+        self.emit("float y = 1.5;")
+        self.indent -= 1
+
+        self.block(0)
+
+        self.indent += 1
+        self.emit(f"return ({self.int_expr()}) % 1000;")
+        self.indent -= 1
+        self.emit("}")
+        self.emit("")
+        if not self.calls:
+            self.leaves.append(name)
+
+    def program(self):
+        self.emit("int g0 = 1;")
+        self.emit("int g1 = 2;")
+        self.emit("float h = 0.5;")
+        self.emit(f"int G[{GLOBAL_ARRAY_SIZE}];")
+        self.emit("")
+        for n in range(self.functions):
+            self.function(n)
+
+        self.emit("int main(void) {")
+        self.indent += 1
+        for name in [f"fn{n}" for n in range(max(self.functions - 3, 0), self.functions)]:
+            self.emit(f"print({name}({self.random.randint(0, 9)}, {self.random.randint(0, 9)}));")
+        self.emit("return 0;")
+        self.indent -= 1
+        self.emit("}")
+        return '\n'.join(self.lines) + '\n'
+
+
+def generate_program(functions=10, statements=6, depth=2, expr_length=4, seed=0):
+    """
+    Devuelve el texto de un programa minic generado al azar
+    """
+    return ProgramGenerator(functions, statements, depth, expr_length, seed).program()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python3 -m minic.synth')
+    parser.add_argument('--functions', type=int, default=10)
+    parser.add_argument('--statements', type=int, default=6)
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--expr-length', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(generate_program(args.functions, args.statements, args.depth, args.expr_length, args.seed), end='')
+
+
+if __name__ == '__main__':
+    main()
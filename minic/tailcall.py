@@ -0,0 +1,80 @@
+# tailcall.py
+"""
+Eliminación de llamadas de cola
+===============================
+
+Una función recursiva como
+
+    int gcd(int a, int b) {
+        if (b == 0) { return a; }
+        return gcd(b, a % b);
+    }
+
+crea un marco nuevo en el intérprete en cada llamada, y con una
+recursión profunda termina agotando la pila de Python.  Cuando la
+llamada recursiva es lo último que hace la función (una llamada de
+cola), el marco actual ya no se necesita y se puede reutilizar:
+
+    CALL    gcd, R5, R8, R9          STORELI R5, 0
+    RET     R9                ==>    STORELI R8, 1
+                                     BRANCH  L12      (entrada de gcd)
+
+Se reconocen las llamadas de una función a sí misma seguidas de un RET
+de su resultado, y en las funciones void las seguidas de RETV o que son
+la última instrucción.  La etiqueta de entrada se agrega al principio de
+la función, antes de los ALLOC de las variables locales, para que cada
+iteración las inicialice igual que una llamada nueva.
+"""
+
+from ircode import OpCode
+
+STORE_LOCAL = {'I': OpCode.STORELI, 'F': OpCode.STORELF, 'B': OpCode.STORELB}
+
+
+def is_tail_call(func, code, pc):
+    """
+    Indica si la instrucción en pc es una llamada de cola de func a sí misma
+    """
+    instruction = code[pc]
+    if instruction[0] != OpCode.CALL or instruction[1] != func.name:
+        return False
+
+    if pc + 1 == len(code):
+        return func.return_type == 'V'
+    following = code[pc + 1]
+    return (following[0] == OpCode.RETV or
+            (following[0] == OpCode.RET and following[1] == instruction[-1]))
+
+
+def eliminate_tail_calls(func, gen):
+    """
+    Reemplaza las llamadas de cola de una función a sí misma por un salto
+    a su entrada.  Devuelve la cantidad de llamadas eliminadas.
+    """
+    code = func.code
+    positions = {pc for pc in range(len(code)) if is_tail_call(func, code, pc)}
+    if not positions:
+        return 0
+
+    entry_label = gen.new_label()
+    new_code = [(OpCode.LABEL, entry_label)]
+    skip = False
+    for pc, instruction in enumerate(code):
+        if skip:
+            # El RET que seguía a la llamada
+            skip = False
+            continue
+
+        if pc in positions:
+            _, _, *arguments, _ = instruction
+            # Los argumentos ya están en registros, así que el orden de los
+            # STORE no importa
+            new_code.extend((STORE_LOCAL[ptype], argument, slot)
+                            for slot, ((_, ptype), argument) in enumerate(zip(func.parameters, arguments)))
+            new_code.append((OpCode.BRANCH, entry_label))
+            skip = pc + 1 < len(code)
+        else:
+            new_code.append(instruction)
+
+    func.code[:] = new_code
+    return len(positions)
@@ -48,11 +48,7 @@ class Type:
 		
 	@classmethod
 	def get_by_name(cls, type_name):
-		for type_cls in cls.__subclasses__():
-			if type_cls.name == type_name:
-				return type_cls
-				
-		return None
+		return _TYPES_BY_NAME.get(type_name)
 
 
 class FloatType(Type):
@@ -61,7 +57,7 @@ class FloatType(Type):
 	@classmethod
 	def binop_type(cls, op, right_type):
 		if issubclass(right_type, FloatType):
-			if op in ARITHM_BIN_OPS:
+			if op in ARITHM_BIN_OPS and op != "%":
 				return FloatType
 			elif op in REL_BIN_OPS:
 				return BoolType
@@ -127,5 +123,44 @@ class BoolType(Type):
 		return None
 
 
+class StringType(Type):
+	"""
+	Tipo de las constantes de texto. Solo se pueden imprimir.
+	"""
+	name = "string"
+
+
 class VoidType(Type):
 	name = "void"
+
+
+# Tablas de operaciones precalculadas al importar el módulo, para que
+# el checker no tenga que recorrer las clases en cada expresión.
+_TYPES_BY_NAME = {type_cls.name: type_cls for type_cls in Type.__subclasses__()}
+
+_BINOP_TABLE = {
+	(op, left_type, right_type): left_type.binop_type(op, right_type)
+	for op in set(ARITHM_BIN_OPS + REL_BIN_OPS + BOOL_BIN_OPS)
+	for left_type in _TYPES_BY_NAME.values()
+	for right_type in _TYPES_BY_NAME.values()
+	if left_type.binop_type(op, right_type)
+}
+
+_UNARYOP_TABLE = {
+	(op, type_cls): type_cls.unaryop_type(op)
+	for op in set(ARITHM_UNARY_OPS + (BOOL_UNARY_OPS,))
+	for type_cls in _TYPES_BY_NAME.values()
+	if type_cls.unaryop_type(op)
+}
+
+
+def result_type(op, left_type, right_type=None):
+	"""
+	Devuelve el tipo resultante de aplicar el operador a los tipos dados,
+	o None si la operación no es válida. Si no se indica right_type, el
+	operador se toma como unario.
+	"""
+	if right_type is None:
+		return _UNARYOP_TABLE.get((op, left_type))
+
+	return _BINOP_TABLE.get((op, left_type, right_type))
@@ -0,0 +1,242 @@
+# vectorize.py
+"""
+Vectorización de ciclos sobre arreglos
+======================================
+
+Un ciclo que recorre arreglos elemento por elemento paga en cada
+iteración el despacho de todas sus instrucciones: las cargas de a[i] y
+b[i], la operación, el guardado y el salto.  La generación de código
+(ver GenerateCode.visit_ForStmt en ircode.py) reconoce con
+match_vector_loop() dos formas de ciclo y genera para todo el ciclo una
+sola instrucción vectorial:
+
+    for (...; i < n; i++)                    ==>   VADDI  a, b, c, i, n
+        a[i] = b[i] + c[i];
+
+    for (...; i < n; i++)                    ==>   VSUMI  s, a, i, n, R1
+        s += a[i];                                 (y R1 se guarda en s)
+
+En la forma elemento a elemento la operación es +, -, * (o / para
+float), escrita como a[i] = x op y o como a[i] op= y, donde cada operando
+es un elemento [i] de un arreglo, una variable escalar o un literal.  Si
+el ciclo no se ejecuta ninguna vez, i no cambia; si no, termina en n.  La
+condición también puede ser i <= n, y el inicio del ciclo puede ser
+cualquiera.
+
+Como cada iteración lee y escribe solo el elemento i, evaluar todas las
+iteraciones juntas da el mismo resultado aunque los arreglos sean el
+mismo.  Los kernels de este módulo ejecutan las instrucciones vectoriales
+en el intérprete:
+
+*   Con arreglos guardados en array.array (el modo --int-bits de
+    interp.py) y NumPy instalado, la operación es una sola llamada de
+    NumPy sobre esos buffers.  Los enteros de NumPy de 32 o 64 bits se
+    desbordan igual que los de C.
+
+*   Si no, se usa map() sobre las porciones de las listas, que evita el
+    despacho de cada instrucción.
+
+Si algún índice queda fuera del arreglo o un float se divide por cero, la
+instrucción se ejecuta elemento por elemento, así el error es el mismo
+que el del ciclo original.  Las sumas de float se acumulan en orden, de
+izquierda a derecha, para no cambiar el redondeo.
+"""
+
+import functools
+import operator
+from array import array
+
+import cast
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Operadores de la forma elemento a elemento, por tipo
+ELEMENTWISE_OPS = {
+    'int': ('+', '-', '*'),
+    'float': ('+', '-', '*', '/'),
+}
+
+NUMPY_UFUNCS = {
+    operator.add: 'add',
+    operator.sub: 'subtract',
+    operator.mul: 'multiply',
+    operator.truediv: 'divide',
+}
+
+
+class VectorLoop:
+    """
+    Un ciclo reconocido por match_vector_loop().  kind es 'map' (a[i] =
+    x op y) o 'sum' (s += a[i]).  Cada operando es el nombre de un
+    arreglo, que se lee en el elemento i, o una expresión escalar.
+    """
+
+    def __init__(self, kind, type_name, target, operands, op='+'):
+        self.kind = kind
+        self.type_name = type_name
+        self.target = target
+        self.operands = operands
+        self.op = op
+
+
+def single_statement(stmt):
+    """
+    Devuelve la expresión del cuerpo de un ciclo que tiene una sola
+    sentencia de expresión, o None
+    """
+    while isinstance(stmt, cast.CompoundStmt) and not stmt.decl and len(stmt.stmt_list) == 1:
+        stmt = stmt.stmt_list[0]
+    return stmt.value if isinstance(stmt, cast.ExprStmt) else None
+
+
+def element_of(expr, index):
+    """
+    Devuelve el nombre del arreglo si expr es arreglo[index], o None
+    """
+    if (isinstance(expr, cast.ArrayExpr) and isinstance(expr.index, cast.VarExpr)
+            and expr.index.name == index):
+        return expr.name
+    return None
+
+
+def vector_operand(expr, index, type_name):
+    """
+    Devuelve el operando de una operación elemento a elemento: el nombre
+    del arreglo, la expresión escalar, o None si expr no sirve
+    """
+    name = element_of(expr, index)
+    if name is not None:
+        return name
+    if isinstance(expr, (cast.IntegerLiteral, cast.FloatLiteral)):
+        return expr
+    if isinstance(expr, cast.VarExpr) and expr.name != index and expr.type.name == type_name:
+        return expr
+    return None
+
+
+def match_vector_loop(body, index):
+    """
+    Reconoce el cuerpo de un ciclo for con contador index que avanza de a
+    uno.  Devuelve un VectorLoop, o None.
+    """
+    expr = single_statement(body)
+
+    if (isinstance(expr, cast.ArrayAssignmentExpr) and isinstance(expr.index, cast.VarExpr)
+            and expr.index.name == index):
+        type_name = expr.type.name
+        if expr.op == '=' and isinstance(expr.value, cast.BinaryOpExpr):
+            op = expr.value.op
+            operands = [vector_operand(expr.value.left, index, type_name),
+                        vector_operand(expr.value.right, index, type_name)]
+        elif expr.op != '=':
+            # a[i] op= y es a[i] = a[i] op y
+            op = expr.op[0]
+            operands = [expr.name, vector_operand(expr.value, index, type_name)]
+        else:
+            return None
+
+        if op not in ELEMENTWISE_OPS.get(type_name, ()) or None in operands:
+            return None
+        if not any(isinstance(operand, str) for operand in operands):
+            return None
+        return VectorLoop('map', type_name, expr.name, operands, op)
+
+    if isinstance(expr, cast.VarAssignmentExpr) and expr.name != index:
+        type_name = expr.type.name
+        if type_name not in ELEMENTWISE_OPS:
+            return None
+        if expr.op == '+=':
+            array_name = element_of(expr.value, index)
+        elif expr.op == '=' and isinstance(expr.value, cast.BinaryOpExpr) and expr.value.op == '+':
+            left, right = expr.value.left, expr.value.right
+            if isinstance(left, cast.VarExpr) and left.name == expr.name:
+                array_name = element_of(right, index)
+            elif isinstance(right, cast.VarExpr) and right.name == expr.name:
+                array_name = element_of(left, index)
+            else:
+                return None
+        else:
+            return None
+        if array_name is not None:
+            return VectorLoop('sum', type_name, expr.name, [array_name])
+
+    return None
+
+
+# Kernels del intérprete
+
+def is_array(value):
+    return isinstance(value, (list, array))
+
+
+def wrapper(int_bits):
+    """
+    Función que trunca un entero a int_bits en complemento a dos (ver el
+    modo int_bits de interp.Interpreter)
+    """
+    bias = 1 << (int_bits - 1)
+    mask = (1 << int_bits) - 1
+    return lambda value: ((value + bias) & mask) - bias
+
+
+def elementwise(op, target, left, right, start, stop, int_bits=None):
+    """
+    target[n] = op(left[n], right[n]) para n en [start, stop).  left y
+    right pueden ser arreglos o escalares.
+    """
+    arrays = [value for value in (target, left, right) if is_array(value)]
+    divides_by_zero = op is operator.truediv and (
+        0.0 in right[start:stop] if is_array(right) else right == 0.0)
+
+    if start < 0 or any(stop > len(values) for values in arrays) or divides_by_zero:
+        # Elemento por elemento, para fallar en el mismo punto que el ciclo
+        wrap = wrapper(int_bits) if int_bits else None
+        for n in range(start, stop):
+            value = op(left[n] if is_array(left) else left, right[n] if is_array(right) else right)
+            target[n] = wrap(value) if wrap else value
+        return
+
+    if numpy is not None and all(isinstance(values, array) for values in arrays):
+        def view(value):
+            if isinstance(value, array):
+                return numpy.frombuffer(value, dtype=value.typecode)[start:stop]
+            return value
+
+        getattr(numpy, NUMPY_UFUNCS[op])(view(left), view(right), out=view(target))
+        return
+
+    def elements(value):
+        return value[start:stop] if is_array(value) else [value] * (stop - start)
+
+    values = map(op, elements(left), elements(right))
+    if int_bits:
+        values = map(wrapper(int_bits), values)
+    target[start:stop] = array(target.typecode, values) if isinstance(target, array) else list(values)
+
+
+def reduce_sum(initial, values, start, stop, int_bits=None, floating=False):
+    """
+    Devuelve initial + values[start] + ... + values[stop - 1], sumando en
+    ese orden
+    """
+    if start < 0 or stop > len(values):
+        wrap = wrapper(int_bits) if int_bits else None
+        total = initial
+        for n in range(start, stop):
+            total = wrap(total + values[n]) if wrap else total + values[n]
+        return total
+
+    if floating:
+        # Desde Python 3.12, sum() compensa el redondeo de los float
+        return functools.reduce(operator.add, values[start:stop], initial)
+
+    if numpy is not None and isinstance(values, array):
+        # La suma en 64 bits se desborda módulo 2**64, así que truncar
+        # después da el mismo resultado
+        total = initial + int(numpy.frombuffer(values, dtype=values.typecode)[start:stop].sum(dtype=numpy.int64))
+    else:
+        total = initial + sum(values[start:stop])
+    return wrapper(int_bits)(total) if int_bits else total